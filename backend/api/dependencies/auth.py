@@ -1,39 +1,105 @@
 # backend/api/dependencies/auth.py
 """Authentication dependencies."""
 
+import base64
+import hashlib
+import hmac
+import json
+import time
+import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
+from datetime import timedelta
+from cachetools import TTLCache
 
 from backend.config import settings
 
 security = HTTPBearer(auto_error=False)
 
+# Verified token payloads, keyed by the SHA-256 digest of the raw token
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=5)
+
+# Registered claims besides "exp" that jwt.decode validates by default
+_PYJWT_CHECKED_CLAIMS = frozenset(("nbf", "iat", "aud"))
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
     to_encode = data.copy()
     
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire_seconds = expires_delta.total_seconds()
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire_seconds = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": int(time.time() + expire_seconds)})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     
     return encoded_jwt
 
 
+def _b64url_decode(segment: str) -> bytes:
+    """Decode a base64url segment, restoring stripped padding."""
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _verify_hs256(token: str) -> Optional[dict]:
+    """
+    Verify a plain HS256 token using stdlib HMAC.
+    
+    Returns the payload on success, raises jwt.InvalidTokenError on a bad
+    signature or expired token, and returns None for anything it does not
+    handle so the caller can defer to PyJWT. Only "exp" is checked here, so
+    tokens carrying other claims jwt.decode validates by default are deferred.
+    """
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64url_decode(header_b64))
+        if not isinstance(header, dict) or header.get("alg") != "HS256":
+            return None
+        signature = _b64url_decode(signature_b64)
+        payload = json.loads(_b64url_decode(payload_b64))
+    except ValueError:
+        return None
+    
+    if not isinstance(payload, dict) or not isinstance(payload.get("exp"), (int, float)):
+        return None
+    if not _PYJWT_CHECKED_CLAIMS.isdisjoint(payload):
+        return None
+    
+    expected = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"{header_b64}.{payload_b64}".encode(),
+        hashlib.sha256
+    ).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise jwt.InvalidSignatureError("Signature verification failed")
+    
+    if payload["exp"] <= time.time():
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    
+    return payload
+
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify JWT token and return payload."""
+    cache_key = hashlib.sha256(token.encode()).digest()
+    
+    cached = _token_cache.get(cache_key)
+    if cached is not None and cached.get("exp", 0) > time.time():
+        return cached
+    
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        return payload
-    except JWTError:
+        payload = _verify_hs256(token)
+        if payload is None:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        # Failed verifications are never cached
         return None
+    
+    _token_cache[cache_key] = payload
+    return payload
 
 
 async def get_current_user_optional(
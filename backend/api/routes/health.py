@@ -1,10 +1,9 @@
 # backend/api/routes/health.py
 """Health check endpoints."""
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter
 
-from backend.database.connection import get_db
+from backend.database.connection import ping_db
 from backend.rag.vectorstore import get_pinecone_manager
 
 router = APIRouter()
@@ -17,10 +16,10 @@ async def health_check():
 
 
 @router.get("/health/db")
-async def database_health(db: Session = Depends(get_db)):
+async def database_health():
     """Database health check."""
     try:
-        db.execute("SELECT 1")
+        await ping_db()
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "database": str(e)}
@@ -1,26 +1,27 @@
 # backend/api/routes/plans.py
 """Plan generation endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from backend.database.connection import get_db
 from backend.models.plan import PlanGenerationRequest, PlanGenerationResponse
-from backend.services.plan_service import PlanService
+from backend.services.plan_service import get_plan_service
 
 router = APIRouter()
-plan_service = PlanService()
+plan_service = get_plan_service()
 
 
 @router.post("/generate", response_model=dict)
 async def generate_plan(
     request: PlanGenerationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Generate a personalized fitness/diet plan using RAG."""
     try:
-        result = plan_service.generate_plan(
+        result = await plan_service.generate_plan(
             db=db,
             user_id=request.user_id,
             plan_type=request.plan_type,
@@ -33,50 +34,84 @@ async def generate_plan(
         raise HTTPException(status_code=500, detail=f"Error generating plan: {str(e)}")
 
 
-@router.post("/{user_id}/workout")
+@router.post("/generate/stream")
+async def stream_plan(
+    request: PlanGenerationRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream a personalized plan as server-sent events while the LLM generates it."""
+    try:
+        events = await plan_service.stream_plan(
+            db=db,
+            user_id=request.user_id,
+            plan_type=request.plan_type,
+            custom_query=request.additional_preferences
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@router.post("/{user_id}/workout", response_model=dict)
 async def generate_workout_plan(
     user_id: str,
-    db: Session = Depends(get_db)
+    regenerate: bool = False,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Generate a workout plan."""
+    """Generate a workout plan (pass regenerate=true for a fresh one rather than a cached repeat)."""
     try:
-        return plan_service.generate_workout_plan(db, user_id)
+        return await plan_service.generate_workout_plan(db, user_id, regenerate)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.post("/{user_id}/diet")
+@router.post("/{user_id}/diet", response_model=dict)
 async def generate_diet_plan(
     user_id: str,
-    db: Session = Depends(get_db)
+    regenerate: bool = False,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Generate a diet plan."""
+    """Generate a diet plan (pass regenerate=true for a fresh one rather than a cached repeat)."""
     try:
-        return plan_service.generate_diet_plan(db, user_id)
+        return await plan_service.generate_diet_plan(db, user_id, regenerate)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.get("/{user_id}/active")
+@router.get("/{user_id}/active", response_model=dict)
 async def get_active_plans(
     user_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get user's active plans."""
-    return plan_service.get_active_plans(db, user_id)
+    """Get user's active plans (conditional GET via ETag/If-None-Match)."""
+    plans, etag = await plan_service.get_active_plans_with_etag(db, user_id)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    
+    response.headers.update(cache_headers)
+    return plans
 
 
-@router.post("/{user_id}/regenerate/{plan_type}")
+@router.post("/{user_id}/regenerate/{plan_type}", response_model=dict)
 async def regenerate_plan(
     user_id: str,
     plan_type: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Regenerate plan based on progress."""
     if plan_type not in ["workout", "diet", "both"]:
         raise HTTPException(status_code=400, detail="Invalid plan type")
     
     try:
-        return plan_service.regenerate_plan_with_progress(db, user_id, plan_type)
+        return await plan_service.regenerate_plan_with_progress(db, user_id, plan_type)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
@@ -1,8 +1,8 @@
 # backend/api/routes/progress.py
 """Progress tracking endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
 from typing import Optional
 
@@ -11,78 +11,87 @@ from backend.models.progress import (
     WeightLog, MeasurementLog, WorkoutLog, 
     CalorieLog, ProgressSummary, ProgressChartData
 )
-from backend.services.progress_service import ProgressService
+from backend.models.responses import ListResponse
+from backend.services.progress_service import get_progress_service
 
 router = APIRouter()
-progress_service = ProgressService()
+progress_service = get_progress_service()
 
 
-@router.post("/{user_id}/weight")
+@router.post("/{user_id}/weight", response_model=dict)
 async def log_weight(
     user_id: str,
     weight_kg: float,
     log_date: Optional[date] = None,
     notes: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Log a weight entry."""
     if log_date is None:
         log_date = date.today()
     
-    return progress_service.log_weight(db, user_id, weight_kg, log_date, notes)
+    return await progress_service.log_weight(db, user_id, weight_kg, log_date, notes)
 
 
-@router.post("/{user_id}/measurements")
+@router.get("/{user_id}/weight", response_model=ListResponse[dict])
+async def get_weight_history(
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get weight history, newest first. Pass `next_cursor` back as `cursor` for the next page."""
+    try:
+        return await progress_service.get_weight_history_page(db, user_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/{user_id}/measurements", response_model=dict)
 async def log_measurements(
     user_id: str,
     measurements: MeasurementLog,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Log body measurements."""
-    return progress_service.log_measurements(
-        db, user_id, measurements.model_dump()
-    )
+    return await progress_service.log_measurements(db, user_id, measurements)
 
 
-@router.post("/{user_id}/workout")
+@router.post("/{user_id}/workout", response_model=dict)
 async def log_workout(
     user_id: str,
     workout: WorkoutLog,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Log workout completion."""
-    return progress_service.log_workout(
-        db, user_id, workout.model_dump()
-    )
+    return await progress_service.log_workout(db, user_id, workout)
 
 
-@router.post("/{user_id}/calories")
+@router.post("/{user_id}/calories", response_model=dict)
 async def log_calories(
     user_id: str,
     calories: CalorieLog,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Log daily calorie intake."""
-    return progress_service.log_calories(
-        db, user_id, calories.model_dump()
-    )
+    return await progress_service.log_calories(db, user_id, calories)
 
 
 @router.get("/{user_id}/summary", response_model=ProgressSummary)
 async def get_progress_summary(
     user_id: str,
     days: int = 30,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get progress summary."""
-    return progress_service.get_progress_summary(db, user_id, days)
+    return await progress_service.get_progress_summary(db, user_id, days)
 
 
 @router.get("/{user_id}/charts", response_model=ProgressChartData)
 async def get_chart_data(
     user_id: str,
     days: int = 30,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get data for progress charts."""
-    return progress_service.get_chart_data(db, user_id, days)
\ No newline at end of file
+    return await progress_service.get_chart_data(db, user_id, days)
\ No newline at end of file
@@ -1,8 +1,13 @@
 # backend/api/routes/rag.py
 """RAG-specific endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import orjson
+import threading
+import uuid
+from cachetools import TTLCache
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.database.connection import get_db
 from backend.models.rag import (
@@ -12,50 +17,43 @@ from backend.models.rag import (
 from backend.rag.chain import get_rag_chain
 from backend.rag.retriever import get_fitness_retriever
 from backend.rag.ingestion import get_ingester
-from backend.services.progress_service import ProgressService
+from backend.services.progress_service import get_progress_service
+from backend.services.user_service import get_user_service
 from backend.database.crud import UserCRUD
 from datetime import datetime
 
 router = APIRouter()
+user_service = get_user_service()
+
+# Bulk ingestion job status, keyed by job ID (in-process only); entries are
+# replaced on every status change, so finished jobs expire a day after ending
+_ingest_jobs: TTLCache = TTLCache(maxsize=256, ttl=86400)
+_ingest_jobs_lock = threading.Lock()
 
 
 @router.post("/query", response_model=RAGResponse)
 async def query_rag(
     query: RAGQuery,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Query the RAG system."""
-    # Get user profile
-    user = UserCRUD.get_by_id(db, query.user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get progress context if requested
     progress_data = None
     if query.include_progress_context:
-        progress_service = ProgressService()
-        progress_data = progress_service.get_progress_context_for_rag(db, query.user_id)
-    
-    # Build user profile dict
-    user_profile = {
-        "name": user.name,
-        "age": user.age,
-        "gender": user.gender,
-        "height_cm": user.height_cm,
-        "weight_kg": user.weight_kg,
-        "fitness_goal": user.fitness_goal,
-        "activity_level": user.activity_level,
-        "dietary_preference": user.dietary_preference,
-        "experience_level": user.experience_level,
-        "workout_location": user.workout_location,
-        "workout_days_per_week": user.workout_days_per_week,
-        "medical_conditions": user.medical_conditions,
-        "allergies": user.allergies
-    }
+        # Load the user and the progress window together
+        user = await UserCRUD.get_with_progress_window(db, query.user_id, days=30)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        user_profile = user_service.profile_from_user(user)
+        progress_data = get_progress_service().build_progress_context(user)
+    else:
+        user_profile = await user_service.get_user_profile(db, query.user_id)
+        if not user_profile:
+            raise HTTPException(status_code=404, detail="User not found")
     
     # Query RAG chain
     rag_chain = get_rag_chain()
-    result = rag_chain.generate_plan(
+    result = await rag_chain.agenerate_plan(
         user_profile=user_profile,
         user_query=query.query,
         plan_type=query.plan_type,
@@ -93,20 +91,21 @@ async def retrieve_documents(
     }
     
     if query.filter_type == "workout":
-        docs = retriever.retrieve_workout_context(
-            query.query, user_profile, query.top_k
+        docs = await asyncio.to_thread(
+            retriever.retrieve_workout_context, query.query, user_profile, query.top_k
         )
     elif query.filter_type == "diet":
-        docs = retriever.retrieve_diet_context(
-            query.query, user_profile, query.top_k
+        docs = await asyncio.to_thread(
+            retriever.retrieve_diet_context, query.query, user_profile, query.top_k
         )
     else:
-        result = retriever.retrieve_combined_context(
+        result = await retriever.aretrieve_combined_context(
             query.query, user_profile, query.top_k // 2
         )
         docs = result["workouts"] + result["diets"]
     
-    return {
+    # Encode with orjson directly; this payload dominates response time
+    return Response(content=orjson.dumps({
         "documents": [
             {
                 "id": doc.metadata.get("id"),
@@ -116,7 +115,7 @@ async def retrieve_documents(
             }
             for doc in docs
         ]
-    }
+    }), media_type="application/json")
 
 
 @router.post("/ingest", response_model=IngestionResponse)
@@ -129,12 +128,9 @@ async def ingest_documents(
         
         if request.overwrite:
             namespace = f"{request.document_type}s"
-            ingester.clear_namespace(namespace)
+            await ingester.aclear_namespace(namespace)
         
-        total_chunks = 0
-        for doc in request.documents:
-            chunks = ingester.ingest_single_document(doc, request.document_type)
-            total_chunks += chunks
+        total_chunks = await ingester.aingest_batch(request.documents, request.document_type)
         
         return IngestionResponse(
             success=True,
@@ -151,27 +147,58 @@ async def ingest_documents(
         )
 
 
-@router.post("/ingest/bulk")
-async def bulk_ingest(
-    data_dir: str = "data/raw"
-):
-    """Bulk ingest all data from directory."""
+def _run_bulk_ingest(job_id: str, data_dir: str):
+    """Run bulk ingestion and record the outcome for the status endpoint."""
+    _set_ingest_job(job_id, status="running")
     try:
-        ingester = get_ingester()
-        stats = ingester.ingest_all(data_dir)
-        
-        return {
-            "success": True,
-            "stats": stats,
-            "message": "Bulk ingestion completed"
-        }
+        stats = get_ingester().ingest_all(data_dir)
+        _set_ingest_job(job_id, status="completed", stats=stats)
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Bulk ingestion failed: {str(e)}"
+        _set_ingest_job(
+            job_id, status="failed", message=f"Bulk ingestion failed: {str(e)}"
         )
 
 
+def _set_ingest_job(job_id: str, **fields) -> None:
+    """Store an updated copy of a job's status, restarting its expiry."""
+    with _ingest_jobs_lock:
+        _ingest_jobs[job_id] = {**_ingest_jobs.get(job_id, {}), **fields}
+
+
+@router.post("/ingest/bulk", status_code=202)
+async def bulk_ingest(
+    background_tasks: BackgroundTasks,
+    data_dir: str = "data/raw"
+):
+    """Start bulk ingestion of all data from directory."""
+    with _ingest_jobs_lock:
+        for job in _ingest_jobs.values():
+            if job["data_dir"] == data_dir and job["status"] in ("queued", "running"):
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Ingestion of {data_dir} is already {job['status']} as job {job['job_id']}"
+                )
+        job_id = str(uuid.uuid4())
+        _ingest_jobs[job_id] = {"job_id": job_id, "status": "queued", "data_dir": data_dir}
+    background_tasks.add_task(_run_bulk_ingest, job_id, data_dir)
+    
+    return {
+        "success": True,
+        "job_id": job_id,
+        "message": "Bulk ingestion started"
+    }
+
+
+@router.get("/ingest/status/{job_id}")
+async def bulk_ingest_status(job_id: str):
+    """Get the status of a bulk ingestion job."""
+    with _ingest_jobs_lock:
+        job = _ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
+
+
 @router.get("/stats")
 async def get_rag_stats():
     """Get RAG system statistics."""
@@ -2,7 +2,7 @@
 """User management endpoints."""
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from backend.database.connection import get_db
@@ -10,20 +10,20 @@ from backend.models.user import (
     UserProfileCreate, UserProfileUpdate, 
     UserProfileResponse, UserStats
 )
-from backend.services.user_service import UserService
+from backend.services.user_service import get_user_service
 
 router = APIRouter()
-user_service = UserService()
+user_service = get_user_service()
 
 
 @router.post("/", response_model=UserProfileResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: UserProfileCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new user profile."""
     try:
-        return user_service.create_user(db, user_data)
+        return await user_service.create_user(db, user_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -31,10 +31,10 @@ async def create_user(
 @router.get("/{user_id}", response_model=UserProfileResponse)
 async def get_user(
     user_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user profile by ID."""
-    user = user_service.get_user(db, user_id)
+    user = await user_service.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -43,10 +43,10 @@ async def get_user(
 @router.get("/email/{email}", response_model=UserProfileResponse)
 async def get_user_by_email(
     email: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user profile by email."""
-    user = user_service.get_user_by_email(db, email)
+    user = await user_service.get_user_by_email(db, email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -56,10 +56,10 @@ async def get_user_by_email(
 async def update_user(
     user_id: str,
     user_data: UserProfileUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user profile."""
-    user = user_service.update_user(db, user_id, user_data)
+    user = await user_service.update_user(db, user_id, user_data)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -68,20 +68,20 @@ async def update_user(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete user profile."""
-    if not user_service.delete_user(db, user_id):
+    if not await user_service.delete_user(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
 
 
 @router.get("/{user_id}/stats", response_model=UserStats)
 async def get_user_stats(
     user_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get calculated stats for a user."""
-    stats = user_service.get_user_stats(db, user_id)
+    stats = await user_service.get_user_stats(db, user_id)
     if not stats:
         raise HTTPException(status_code=404, detail="User not found")
     
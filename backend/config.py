@@ -24,11 +24,17 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./fitness_planner.db"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
     
     # Pinecone
     PINECONE_API_KEY: str
     PINECONE_ENVIRONMENT: str = "us-east-1"
     PINECONE_INDEX_NAME: str = "fitness-diet-planner"
+    PINECONE_POOL_THREADS: int = 30
+    PINECONE_CONNECTION_POOL_SIZE: int = 30
     
     # Google Gemini
     GOOGLE_API_KEY: str
@@ -42,7 +48,9 @@ class Settings(BaseSettings):
     # RAG Configuration
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    USE_RECURSIVE_SPLITTER: bool = False  # LangChain splitter, for comparing chunk output
     TOP_K_RESULTS: int = 5
+    INGESTION_WORKERS: int = 8
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -6,7 +6,9 @@ import logging
 from typing import Callable
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from backend.core.exceptions import FitnessPlannerException
 
@@ -34,30 +36,39 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
             )
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging requests."""
+class RequestLoggingMiddleware:
+    """Middleware for logging requests (pure ASGI, no BaseHTTPMiddleware wrapping)."""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         start_time = time.time()
+        method, path = scope["method"], scope["path"]
         
         # Log request
-        logger.info(f"Request: {request.method} {request.url.path}")
-        
-        response = await call_next(request)
-        
-        # Calculate duration
-        duration = time.time() - start_time
-        
-        # Log response
-        logger.info(
-            f"Response: {request.method} {request.url.path} "
-            f"- Status: {response.status_code} - Duration: {duration:.3f}s"
-        )
+        logger.info(f"Request: {method} {path}")
         
-        # Add timing header
-        response.headers["X-Process-Time"] = str(duration)
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Calculate duration
+                duration = time.time() - start_time
+                
+                # Log response
+                logger.info(
+                    f"Response: {method} {path} "
+                    f"- Status: {message['status']} - Duration: {duration:.3f}s"
+                )
+                
+                # Add timing header
+                MutableHeaders(scope=message).append("X-Process-Time", str(duration))
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_with_timing)
 
 
 class CORSDebugMiddleware(BaseHTTPMiddleware):
@@ -1,13 +1,16 @@
 # backend/core/security.py
 """Security utilities."""
 
+import asyncio
 import hashlib
+import hmac
 import secrets
 from typing import Optional
 from passlib.context import CryptContext
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context (10 rounds keeps login/register latency down;
+# existing hashes with higher rounds still verify)
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=10, deprecated="auto")
 
 
 def hash_password(password: str) -> str:
@@ -20,6 +23,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """Hash a password in a worker thread to keep the event loop free."""
+    return await asyncio.to_thread(pwd_context.hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in a worker thread to keep the event loop free."""
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
+
+
 def generate_token(length: int = 32) -> str:
     """Generate a secure random token."""
     return secrets.token_urlsafe(length)
@@ -30,6 +43,11 @@ def generate_api_key() -> str:
     return f"fp_{secrets.token_urlsafe(32)}"
 
 
-def hash_api_key(api_key: str) -> str:
-    """Hash an API key for storage."""
-    return hashlib.sha256(api_key.encode()).hexdigest()
\ No newline at end of file
+def hash_api_key(api_key: str) -> bytes:
+    """Hash an API key for storage as a fixed-size 32-byte digest."""
+    return hashlib.sha256(api_key.encode()).digest()
+
+
+def verify_api_key(api_key: str, stored_hash: bytes) -> bool:
+    """Check an API key against its stored digest in constant time."""
+    return hmac.compare_digest(hash_api_key(api_key), stored_hash)
\ No newline at end of file
@@ -1,33 +1,94 @@
 # backend/database/connection.py
 """Database connection and session management."""
 
-from sqlalchemy import create_engine
+import asyncio
+import orjson
+from contextlib import AsyncExitStack
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from backend.config import settings
 
+
+def _async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
+
+
+def _json_serializer(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+
+_is_sqlite = "sqlite" in settings.DATABASE_URL
+
 # Create engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+if _is_sqlite:
+    engine = create_async_engine(
+        _async_database_url(settings.DATABASE_URL),
+        connect_args={"check_same_thread": False},
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads
+    )
+else:
+    engine = create_async_engine(
+        _async_database_url(settings.DATABASE_URL),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads
+    )
+
+
+if _is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        """Enable WAL so readers don't block on the writer."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Create base class for models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """Dependency to get database session."""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
+async def init_db():
     """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def ping_db() -> None:
+    """Run a trivial query on a pooled connection, bypassing the ORM."""
+    async with engine.connect() as conn:
+        await conn.scalar(text("SELECT 1"))
+
+
+async def warm_up_pool() -> None:
+    """Open the pool's steady-state connections up front so early requests skip the connect handshake."""
+    size = 1 if _is_sqlite else settings.DB_POOL_SIZE
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(size))
+        )
+        await asyncio.gather(*(conn.scalar(text("SELECT 1")) for conn in conns))
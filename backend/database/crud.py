@@ -1,9 +1,11 @@
 # backend/database/crud.py
 """CRUD operations for database models."""
 
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, desc, func, insert, lambda_stmt, select, true, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import load_only, selectinload
+from typing import List, Optional, Tuple
 from datetime import date, datetime, timedelta
 
 from backend.database.models import (
@@ -17,200 +19,402 @@ class UserCRUD:
     """CRUD operations for User model."""
     
     @staticmethod
-    def create(db: Session, user: UserProfileCreate) -> User:
+    async def create(db: AsyncSession, user: UserProfileCreate) -> User:
         """Create a new user."""
-        db_user = User(**user.model_dump())
+        user_data = user.model_dump()
+        db_user = User(**user_data)
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
     
     @staticmethod
-    def get_by_id(db: Session, user_id: str) -> Optional[User]:
-        """Get user by ID."""
-        return db.query(User).filter(User.id == user_id).first()
+    async def get_by_id(db: AsyncSession, user_id: str,
+                        loads: Tuple[str, ...] = ()) -> Optional[User]:
+        """Get user by ID, batch-loading the relationships named in `loads`."""
+        if not loads:
+            return await db.scalar(lambda_stmt(lambda: select(User).where(User.id == user_id)))
+        return await db.scalar(
+            select(User)
+            .options(*(selectinload(getattr(User, name)) for name in loads))
+            .where(User.id == user_id)
+        )
+    
+    @staticmethod
+    async def get_updated_at(db: AsyncSession, user_id: str) -> Optional[datetime]:
+        """Get only the user's last-modified time, or None if the user does not exist."""
+        return await db.scalar(lambda_stmt(lambda: select(User.updated_at).where(User.id == user_id)))
+    
+    @staticmethod
+    async def get_with_progress_window(db: AsyncSession, user_id: str,
+                                       days: int = 30) -> Optional[User]:
+        """Get user with weight, workout and calorie logs from the last `days` preloaded."""
+        cutoff_date = date.today() - timedelta(days=days)
+        return await db.scalar(
+            select(User)
+            .options(
+                selectinload(User.weight_logs.and_(WeightLog.date >= cutoff_date)),
+                selectinload(User.workout_logs.and_(WorkoutLog.date >= cutoff_date)),
+                selectinload(User.calorie_logs.and_(CalorieLog.date >= cutoff_date))
+            )
+            .where(User.id == user_id)
+            .execution_options(populate_existing=True)
+        )
     
     @staticmethod
-    def get_by_email(db: Session, email: str) -> Optional[User]:
+    async def get_by_email(db: AsyncSession, email: str) -> Optional[User]:
         """Get user by email."""
-        return db.query(User).filter(User.email == email.lower()).first()
+        email = email.lower()
+        return await db.scalar(lambda_stmt(lambda: select(User).where(User.email == email)))
     
     @staticmethod
-    def update(db: Session, user_id: str, user_update: UserProfileUpdate) -> Optional[User]:
+    async def update(db: AsyncSession, user_id: str, user_update: UserProfileUpdate) -> Optional[User]:
         """Update user profile."""
-        db_user = db.query(User).filter(User.id == user_id).first()
+        db_user = await db.scalar(select(User).where(User.id == user_id))
         if db_user:
             update_data = user_update.model_dump(exclude_unset=True)
             for field, value in update_data.items():
                 setattr(db_user, field, value)
-            db.commit()
-            db.refresh(db_user)
+            await db.commit()
+            await db.refresh(db_user)
         return db_user
     
     @staticmethod
-    def delete(db: Session, user_id: str) -> bool:
+    async def delete(db: AsyncSession, user_id: str) -> bool:
         """Delete user."""
-        db_user = db.query(User).filter(User.id == user_id).first()
+        db_user = await db.scalar(select(User).where(User.id == user_id))
         if db_user:
-            db.delete(db_user)
-            db.commit()
+            await db.delete(db_user)
+            await db.commit()
             return True
         return False
 
 
 class ProgressCRUD:
-    """CRUD operations for progress tracking."""
+    """CRUD operations for progress tracking.
+    
+    Single-row logs skip the post-commit refresh: ids and timestamps are
+    Python-side defaults, so they are already set on the instance at flush.
+    """
+    
+    @staticmethod
+    async def _insert_many(db: AsyncSession, model, user_id: str,
+                           rows: List[dict]) -> List[str]:
+        """Insert many log rows in one statement and commit once."""
+        if not rows:
+            return []
+        result = await db.scalars(
+            insert(model).returning(model.id),
+            [{**row, "user_id": user_id} for row in rows]
+        )
+        ids = result.all()
+        await db.commit()
+        return ids
+    
+    @staticmethod
+    async def summarize(db: AsyncSession, user_id: str, days: int = 30) -> Row:
+        """
+        Aggregate the progress window in a single query.
+        
+        Returns a row with starting_weight, current_weight, weight_count,
+        workouts_total, workouts_completed, avg_calories and calorie_count.
+        """
+        cutoff_date = date.today() - timedelta(days=days)
+        weights = select(WeightLog.weight_kg).where(
+            WeightLog.user_id == user_id,
+            WeightLog.date >= cutoff_date
+        )
+        # Workout and calorie stats each come from one aggregate scan
+        workouts = select(
+            func.count().label("total"),
+            func.coalesce(func.sum(case((WorkoutLog.completed == True, 1), else_=0)), 0)
+            .label("completed")
+        ).where(
+            WorkoutLog.user_id == user_id,
+            WorkoutLog.date >= cutoff_date
+        ).subquery()
+        calories = select(
+            func.avg(CalorieLog.total_calories).label("average"),
+            func.count().label("total")
+        ).where(
+            CalorieLog.user_id == user_id,
+            CalorieLog.date >= cutoff_date
+        ).subquery()
+        result = await db.execute(
+            select(
+                weights.order_by(WeightLog.date, WeightLog.id).limit(1)
+                .scalar_subquery().label("starting_weight"),
+                weights.order_by(desc(WeightLog.date), desc(WeightLog.id)).limit(1)
+                .scalar_subquery().label("current_weight"),
+                weights.with_only_columns(func.count())
+                .scalar_subquery().label("weight_count"),
+                workouts.c.total.label("workouts_total"),
+                workouts.c.completed.label("workouts_completed"),
+                calories.c.average.label("avg_calories"),
+                calories.c.total.label("calorie_count")
+            ).select_from(workouts).join(calories, true())
+        )
+        return result.one()
+    
+    @staticmethod
+    async def _get_history_columns(db: AsyncSession, model, user_id: str, days: int,
+                                   columns: Tuple[str, ...]) -> List:
+        """Get recent logs, newest first, with only the named columns loaded."""
+        cutoff_date = date.today() - timedelta(days=days)
+        result = await db.scalars(
+            select(model)
+            .options(load_only(*(getattr(model, name) for name in columns)))
+            .where(model.user_id == user_id, model.date >= cutoff_date)
+            .order_by(desc(model.date))
+        )
+        return result.all()
     
     @staticmethod
-    def log_weight(db: Session, user_id: str, weight_kg: float, 
-                   log_date: date, notes: Optional[str] = None) -> WeightLog:
+    async def log_weight(db: AsyncSession, user_id: str, weight_kg: float, 
+                         log_date: date, notes: Optional[str] = None) -> WeightLog:
         """Log weight entry."""
         log = WeightLog(
             user_id=user_id,
             weight_kg=weight_kg,
-            date=datetime.combine(log_date, datetime.min.time()),
+            date=log_date,
             notes=notes
         )
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        await db.commit()
         return log
     
     @staticmethod
-    def get_weight_history(db: Session, user_id: str, 
-                          days: int = 30) -> List[WeightLog]:
-        """Get weight history for user."""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        return db.query(WeightLog).filter(
-            WeightLog.user_id == user_id,
-            WeightLog.date >= cutoff_date
-        ).order_by(desc(WeightLog.date)).all()
+    async def log_weights_bulk(db: AsyncSession, user_id: str,
+                               rows: List[dict]) -> List[str]:
+        """Log many weight entries at once. Returns the new log IDs."""
+        return await ProgressCRUD._insert_many(db, WeightLog, user_id, rows)
+    
+    @staticmethod
+    async def get_weight_history(db: AsyncSession, user_id: str, 
+                                 days: int = 30,
+                                 columns: Tuple[str, ...] = ()) -> List[WeightLog]:
+        """Get weight history for user, loading only `columns` (plus the key) when given."""
+        if columns:
+            return await ProgressCRUD._get_history_columns(db, WeightLog, user_id, days, columns)
+        
+        cutoff_date = date.today() - timedelta(days=days)
+        result = await db.scalars(lambda_stmt(
+            lambda: select(WeightLog).where(
+                WeightLog.user_id == user_id,
+                WeightLog.date >= cutoff_date
+            ).order_by(desc(WeightLog.date))
+        ))
+        return result.all()
+    
+    @staticmethod
+    async def get_weight_page(db: AsyncSession, user_id: str,
+                              before: Optional[Tuple[date, str]] = None,
+                              limit: int = 100) -> List[WeightLog]:
+        """Get a page of weight history, newest first, older than the (date, id) key `before`."""
+        query = select(WeightLog).where(WeightLog.user_id == user_id)
+        if before is not None:
+            query = query.where(tuple_(WeightLog.date, WeightLog.id) < before)
+        result = await db.scalars(
+            query.order_by(desc(WeightLog.date), desc(WeightLog.id)).limit(limit)
+        )
+        return result.all()
     
     @staticmethod
-    def log_measurements(db: Session, user_id: str, 
-                        measurements: dict) -> MeasurementLog:
+    async def log_measurements(db: AsyncSession, user_id: str, 
+                               measurements: dict) -> MeasurementLog:
         """Log body measurements."""
         log = MeasurementLog(user_id=user_id, **measurements)
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        await db.commit()
         return log
     
     @staticmethod
-    def get_measurement_history(db: Session, user_id: str,
-                               days: int = 90) -> List[MeasurementLog]:
-        """Get measurement history."""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        return db.query(MeasurementLog).filter(
-            MeasurementLog.user_id == user_id,
-            MeasurementLog.date >= cutoff_date
-        ).order_by(desc(MeasurementLog.date)).all()
+    async def log_measurements_bulk(db: AsyncSession, user_id: str,
+                                    rows: List[dict]) -> List[str]:
+        """Log many measurement entries at once. Returns the new log IDs."""
+        return await ProgressCRUD._insert_many(db, MeasurementLog, user_id, rows)
     
     @staticmethod
-    def log_workout(db: Session, user_id: str, workout_data: dict) -> WorkoutLog:
+    async def get_measurement_history(db: AsyncSession, user_id: str,
+                                      days: int = 90,
+                                      columns: Tuple[str, ...] = ()) -> List[MeasurementLog]:
+        """Get measurement history, loading only `columns` (plus the key) when given."""
+        if columns:
+            return await ProgressCRUD._get_history_columns(db, MeasurementLog, user_id, days, columns)
+        
+        cutoff_date = date.today() - timedelta(days=days)
+        result = await db.scalars(lambda_stmt(
+            lambda: select(MeasurementLog).where(
+                MeasurementLog.user_id == user_id,
+                MeasurementLog.date >= cutoff_date
+            ).order_by(desc(MeasurementLog.date))
+        ))
+        return result.all()
+    
+    @staticmethod
+    async def log_workout(db: AsyncSession, user_id: str, workout_data: dict) -> WorkoutLog:
         """Log workout completion."""
         log = WorkoutLog(user_id=user_id, **workout_data)
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        await db.commit()
         return log
     
     @staticmethod
-    def get_workout_history(db: Session, user_id: str,
-                           days: int = 30) -> List[WorkoutLog]:
-        """Get workout history."""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        return db.query(WorkoutLog).filter(
-            WorkoutLog.user_id == user_id,
-            WorkoutLog.date >= cutoff_date
-        ).order_by(desc(WorkoutLog.date)).all()
+    async def log_workouts_bulk(db: AsyncSession, user_id: str,
+                                rows: List[dict]) -> List[str]:
+        """Log many workouts at once. Returns the new log IDs."""
+        return await ProgressCRUD._insert_many(db, WorkoutLog, user_id, rows)
+    
+    @staticmethod
+    async def get_workout_history(db: AsyncSession, user_id: str,
+                                  days: int = 30,
+                                  columns: Tuple[str, ...] = ()) -> List[WorkoutLog]:
+        """Get workout history, loading only `columns` (plus the key) when given."""
+        if columns:
+            return await ProgressCRUD._get_history_columns(db, WorkoutLog, user_id, days, columns)
+        
+        cutoff_date = date.today() - timedelta(days=days)
+        result = await db.scalars(lambda_stmt(
+            lambda: select(WorkoutLog).where(
+                WorkoutLog.user_id == user_id,
+                WorkoutLog.date >= cutoff_date
+            ).order_by(desc(WorkoutLog.date))
+        ))
+        return result.all()
     
     @staticmethod
-    def log_calories(db: Session, user_id: str, calorie_data: dict) -> CalorieLog:
+    async def log_calories(db: AsyncSession, user_id: str, calorie_data: dict) -> CalorieLog:
         """Log daily calorie intake."""
         log = CalorieLog(user_id=user_id, **calorie_data)
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        await db.commit()
         return log
     
     @staticmethod
-    def get_calorie_history(db: Session, user_id: str,
-                           days: int = 30) -> List[CalorieLog]:
-        """Get calorie history."""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        return db.query(CalorieLog).filter(
-            CalorieLog.user_id == user_id,
-            CalorieLog.date >= cutoff_date
-        ).order_by(desc(CalorieLog.date)).all()
+    async def log_calories_bulk(db: AsyncSession, user_id: str,
+                                rows: List[dict]) -> List[str]:
+        """Log many daily calorie entries at once. Returns the new log IDs."""
+        return await ProgressCRUD._insert_many(db, CalorieLog, user_id, rows)
+    
+    @staticmethod
+    async def get_calorie_history(db: AsyncSession, user_id: str,
+                                  days: int = 30,
+                                  columns: Tuple[str, ...] = ()) -> List[CalorieLog]:
+        """Get calorie history, loading only `columns` (plus the key) when given."""
+        if columns:
+            return await ProgressCRUD._get_history_columns(db, CalorieLog, user_id, days, columns)
+        
+        cutoff_date = date.today() - timedelta(days=days)
+        result = await db.scalars(lambda_stmt(
+            lambda: select(CalorieLog).where(
+                CalorieLog.user_id == user_id,
+                CalorieLog.date >= cutoff_date
+            ).order_by(desc(CalorieLog.date))
+        ))
+        return result.all()
 
 
 class PlanCRUD:
     """CRUD operations for workout and diet plans."""
     
     @staticmethod
-    def save_workout_plan(db: Session, user_id: str, plan_data: dict) -> WorkoutPlanDB:
-        """Save workout plan."""
+    async def _save_plan(db: AsyncSession, model, user_id: str, plan_data: dict,
+                         default_name: str, commit: bool = True):
+        """Deactivate the user's current plan and insert the new one in one transaction."""
+        # Bump the user's plan version first: the row lock it takes serializes
+        # concurrent saves for this user, so a second transaction's UPDATE sees
+        # the first one's committed plan instead of violating the one-active-plan
+        # index on insert. updated_at is kept so profile caches stay valid.
+        await db.execute(
+            update(User).where(User.id == user_id)
+            .values(plan_version=User.plan_version + 1, updated_at=User.updated_at)
+        )
+        
         # Deactivate previous plans
-        db.query(WorkoutPlanDB).filter(
-            WorkoutPlanDB.user_id == user_id,
-            WorkoutPlanDB.is_active == True
-        ).update({"is_active": False})
+        await db.execute(
+            update(model).where(
+                model.user_id == user_id,
+                model.is_active == True
+            ).values(is_active=False)
+        )
         
-        plan = WorkoutPlanDB(
-            user_id=user_id,
-            plan_name=plan_data.get("plan_name", "Custom Workout Plan"),
-            description=plan_data.get("description", ""),
-            plan_data=plan_data,
-            sources=plan_data.get("sources", [])
+        plan = await db.scalar(
+            insert(model).returning(model),
+            [{
+                "user_id": user_id,
+                "plan_name": plan_data.get("plan_name", default_name),
+                "description": plan_data.get("description", ""),
+                "plan_data": plan_data,
+                "sources": plan_data.get("sources", [])
+            }]
         )
-        db.add(plan)
-        db.commit()
-        db.refresh(plan)
+        if commit:
+            await db.commit()
         return plan
     
     @staticmethod
-    def get_active_workout_plan(db: Session, user_id: str) -> Optional[WorkoutPlanDB]:
+    async def get_plan_version(db: AsyncSession, user_id: str) -> Optional[int]:
+        """Get only the user's active-plan version, or None if the user does not exist."""
+        return await db.scalar(lambda_stmt(lambda: select(User.plan_version).where(User.id == user_id)))
+    
+    @staticmethod
+    async def save_workout_plan(db: AsyncSession, user_id: str, plan_data: dict) -> WorkoutPlanDB:
+        """Save workout plan."""
+        return await PlanCRUD._save_plan(db, WorkoutPlanDB, user_id, plan_data, "Custom Workout Plan")
+    
+    @staticmethod
+    async def get_active_workout_plan(db: AsyncSession, user_id: str) -> Optional[WorkoutPlanDB]:
         """Get active workout plan for user."""
-        return db.query(WorkoutPlanDB).filter(
-            WorkoutPlanDB.user_id == user_id,
-            WorkoutPlanDB.is_active == True
-        ).first()
+        return await db.scalar(lambda_stmt(
+            lambda: select(WorkoutPlanDB).where(
+                WorkoutPlanDB.user_id == user_id,
+                WorkoutPlanDB.is_active == True
+            )
+        ))
     
     @staticmethod
-    def save_diet_plan(db: Session, user_id: str, plan_data: dict) -> DietPlanDB:
+    async def save_diet_plan(db: AsyncSession, user_id: str, plan_data: dict) -> DietPlanDB:
         """Save diet plan."""
-        # Deactivate previous plans
-        db.query(DietPlanDB).filter(
-            DietPlanDB.user_id == user_id,
-            DietPlanDB.is_active == True
-        ).update({"is_active": False})
-        
-        plan = DietPlanDB(
-            user_id=user_id,
-            plan_name=plan_data.get("plan_name", "Custom Diet Plan"),
-            description=plan_data.get("description", ""),
-            plan_data=plan_data,
-            sources=plan_data.get("sources", [])
-        )
-        db.add(plan)
-        db.commit()
-        db.refresh(plan)
-        return plan
+        return await PlanCRUD._save_plan(db, DietPlanDB, user_id, plan_data, "Custom Diet Plan")
     
     @staticmethod
-    def get_active_diet_plan(db: Session, user_id: str) -> Optional[DietPlanDB]:
+    async def save_plans_bulk(
+        db: AsyncSession,
+        user_id: str,
+        workout_data: Optional[dict] = None,
+        diet_data: Optional[dict] = None
+    ) -> Tuple[Optional[WorkoutPlanDB], Optional[DietPlanDB]]:
+        """Save a workout and/or diet plan with a single commit."""
+        workout_plan = diet_plan = None
+        if workout_data is not None:
+            workout_plan = await PlanCRUD._save_plan(
+                db, WorkoutPlanDB, user_id, workout_data, "Custom Workout Plan", commit=False
+            )
+        if diet_data is not None:
+            diet_plan = await PlanCRUD._save_plan(
+                db, DietPlanDB, user_id, diet_data, "Custom Diet Plan", commit=False
+            )
+        await db.commit()
+        return workout_plan, diet_plan
+    
+    @staticmethod
+    async def get_active_diet_plan(db: AsyncSession, user_id: str) -> Optional[DietPlanDB]:
         """Get active diet plan for user."""
-        return db.query(DietPlanDB).filter(
-            DietPlanDB.user_id == user_id,
-            DietPlanDB.is_active == True
-        ).first()
+        return await db.scalar(lambda_stmt(
+            lambda: select(DietPlanDB).where(
+                DietPlanDB.user_id == user_id,
+                DietPlanDB.is_active == True
+            )
+        ))
     
     @staticmethod
-    def get_plan_history(db: Session, user_id: str, 
-                        plan_type: str = "workout") -> List:
+    async def get_plan_history(db: AsyncSession, user_id: str, 
+                               plan_type: str = "workout") -> List:
         """Get plan history."""
         model = WorkoutPlanDB if plan_type == "workout" else DietPlanDB
-        return db.query(model).filter(
-            model.user_id == user_id
-        ).order_by(desc(model.created_at)).limit(10).all()
\ No newline at end of file
+        result = await db.scalars(
+            select(model).where(
+                model.user_id == user_id
+            ).order_by(desc(model.created_at)).limit(10)
+        )
+        return result.all()
\ No newline at end of file
@@ -1,16 +1,41 @@
 # backend/database/models.py
 """SQLAlchemy ORM models."""
 
-from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, Boolean, Text, ForeignKey, JSON, Index, text
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import os
+import time
 import uuid
 
 from backend.database.connection import Base
+from backend.models.user import (
+    ActivityLevel, DietaryPreference, ExperienceLevel,
+    FitnessGoal, Gender, WorkoutLocation
+)
+
+
+# Binary JSONB on PostgreSQL (no reparse on read, GIN-indexable), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+def enum_type(enum_cls, name: str) -> SAEnum:
+    """Native ENUM on PostgreSQL, CHECK-constrained string elsewhere; values stay plain strings."""
+    return SAEnum(*(member.value for member in enum_cls), name=name, create_constraint=True)
 
 
 def generate_uuid():
-    return str(uuid.uuid4())
+    """Time-ordered UUIDv7 (RFC 9562), so primary-key inserts append to the B-tree."""
+    unix_ts_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (unix_ts_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76                        # version
+    value |= (rand >> 68) << 64               # rand_a (12 bits)
+    value |= 0b10 << 62                       # variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF     # rand_b (62 bits)
+    return str(uuid.UUID(int=value))
 
 
 class User(Base):
@@ -21,19 +46,21 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
     age = Column(Integer, nullable=False)
-    gender = Column(String, nullable=False)
+    gender = Column(enum_type(Gender, "gender_enum"), nullable=False)
     height_cm = Column(Float, nullable=False)
     weight_kg = Column(Float, nullable=False)
-    fitness_goal = Column(String, nullable=False)
-    activity_level = Column(String, nullable=False)
-    dietary_preference = Column(String, nullable=False)
-    experience_level = Column(String, nullable=False)
-    workout_location = Column(String, nullable=False)
+    fitness_goal = Column(enum_type(FitnessGoal, "fitness_goal_enum"), nullable=False)
+    activity_level = Column(enum_type(ActivityLevel, "activity_level_enum"), nullable=False)
+    dietary_preference = Column(enum_type(DietaryPreference, "dietary_preference_enum"), nullable=False)
+    experience_level = Column(enum_type(ExperienceLevel, "experience_level_enum"), nullable=False)
+    workout_location = Column(enum_type(WorkoutLocation, "workout_location_enum"), nullable=False)
     workout_days_per_week = Column(Integer, nullable=False)
     medical_conditions = Column(Text, nullable=True)
     allergies = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped whenever the active workout/diet plans change; versions cached plans
+    plan_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     weight_logs = relationship("WeightLog", back_populates="user", cascade="all, delete-orphan")
@@ -47,11 +74,15 @@ class User(Base):
 class WeightLog(Base):
     """Weight log model."""
     __tablename__ = "weight_logs"
+    __table_args__ = (
+        # Serves the per-user date-window history queries
+        Index("ix_weight_logs_user_date", "user_id", "date"),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     weight_kg = Column(Float, nullable=False)
-    date = Column(DateTime, nullable=False)
+    date = Column(Date, nullable=False)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -61,10 +92,14 @@ class WeightLog(Base):
 class MeasurementLog(Base):
     """Body measurement log model."""
     __tablename__ = "measurement_logs"
+    __table_args__ = (
+        # Serves the per-user date-window history queries
+        Index("ix_measurement_logs_user_date", "user_id", "date"),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    date = Column(DateTime, nullable=False)
+    date = Column(Date, nullable=False)
     chest_cm = Column(Float, nullable=True)
     waist_cm = Column(Float, nullable=True)
     hips_cm = Column(Float, nullable=True)
@@ -80,13 +115,17 @@ class MeasurementLog(Base):
 class WorkoutLog(Base):
     """Workout completion log model."""
     __tablename__ = "workout_logs"
+    __table_args__ = (
+        # Serves the per-user date-window history queries
+        Index("ix_workout_logs_user_date", "user_id", "date"),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    date = Column(DateTime, nullable=False)
+    date = Column(Date, nullable=False)
     workout_day_id = Column(String, nullable=False)
     completed = Column(Boolean, default=False)
-    exercises_completed = Column(JSON, nullable=True)
+    exercises_completed = Column(JSONType, nullable=True)
     duration_mins = Column(Integer, nullable=True)
     energy_level = Column(Integer, nullable=True)
     notes = Column(Text, nullable=True)
@@ -98,11 +137,15 @@ class WorkoutLog(Base):
 class CalorieLog(Base):
     """Daily calorie intake log model."""
     __tablename__ = "calorie_logs"
+    __table_args__ = (
+        # Serves the per-user date-window history queries
+        Index("ix_calorie_logs_user_date", "user_id", "date"),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    date = Column(DateTime, nullable=False)
-    meals = Column(JSON, nullable=True)
+    date = Column(Date, nullable=False)
+    meals = Column(JSONType, nullable=True)
     total_calories = Column(Integer, nullable=False)
     total_protein = Column(Float, nullable=True)
     total_carbs = Column(Float, nullable=True)
@@ -117,13 +160,25 @@ class CalorieLog(Base):
 class WorkoutPlanDB(Base):
     """Stored workout plan model."""
     __tablename__ = "workout_plans"
+    __table_args__ = (
+        # At most one active plan per user; also serves active-plan lookups
+        Index(
+            "uq_workout_plans_user_active", "user_id", unique=True,
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active")
+        ),
+        # Containment (@>) lookups on cited sources
+        Index(
+            "ix_workout_plans_sources", "sources", postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     plan_name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    plan_data = Column(JSON, nullable=False)
-    sources = Column(JSON, nullable=True)
+    plan_data = Column(JSONType, nullable=False)
+    sources = Column(JSONType, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -134,13 +189,25 @@ class WorkoutPlanDB(Base):
 class DietPlanDB(Base):
     """Stored diet plan model."""
     __tablename__ = "diet_plans"
+    __table_args__ = (
+        # At most one active plan per user; also serves active-plan lookups
+        Index(
+            "uq_diet_plans_user_active", "user_id", unique=True,
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active")
+        ),
+        # Containment (@>) lookups on cited sources
+        Index(
+            "ix_diet_plans_sources", "sources", postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     plan_name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    plan_data = Column(JSON, nullable=False)
-    sources = Column(JSON, nullable=True)
+    plan_data = Column(JSONType, nullable=False)
+    sources = Column(JSONType, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
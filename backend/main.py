@@ -1,20 +1,38 @@
 # backend/main.py
 """FastAPI application entry point."""
 
+import atexit
 import logging
-from fastapi import FastAPI
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 
 from backend.config import settings
-from backend.database.connection import init_db
+from backend.database.connection import init_db, warm_up_pool
+from backend.rag.chain import warm_up_rag_components
+from backend.models import warm_up_validators
 from backend.api.routes import users, plans, progress, rag, health
 from backend.core.middleware import ErrorHandlingMiddleware, RequestLoggingMiddleware
 
-# Configure logging
+# Configure logging: handlers only enqueue records, and a listener thread
+# writes them out, so request handlers never wait on the stream lock
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(
+    logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+)
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+_log_queue_handler = QueueHandler(_log_queue)
+# Records are enqueued pre-merged; the listener's handler applies the real format
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s"))
 logging.basicConfig(
     level=logging.DEBUG if settings.DEBUG else logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    handlers=[_log_queue_handler]
 )
 logger = logging.getLogger(__name__)
 
@@ -26,12 +44,23 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting Fitness & Diet Planner API...")
     
     try:
-        init_db()
+        await init_db()
+        await warm_up_pool()
         logger.info("✅ Database initialized")
     except Exception as e:
         logger.error(f"❌ Database initialization failed: {e}")
         raise
     
+    warm_up_validators()
+    # Build and cache the OpenAPI schema now rather than on the first /docs hit
+    app.openapi()
+    
+    try:
+        warm_up_rag_components()
+        logger.info("✅ RAG components warmed up")
+    except Exception as e:
+        logger.warning(f"⚠️ RAG warm-up failed, will initialize lazily: {e}")
+    
     yield
     
     # Shutdown
@@ -63,8 +92,9 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Add middleware
-app.add_middleware(RequestLoggingMiddleware)
+# Add middleware (per-request logging only in debug mode)
+if settings.DEBUG:
+    app.add_middleware(RequestLoggingMiddleware)
 app.add_middleware(ErrorHandlingMiddleware)
 
 # Configure CORS
@@ -76,6 +106,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large plan/RAG payloads
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 # Include routers
 app.include_router(
     health.router, 
@@ -104,26 +137,34 @@ app.include_router(
 )
 
 
+# Root/info payloads depend only on settings; build them once
+_ROOT_INFO = {
+    "message": f"Welcome to {settings.APP_NAME}",
+    "version": settings.APP_VERSION,
+    "docs": "/docs",
+    "health": f"{settings.API_PREFIX}/health"
+}
+_API_INFO = {
+    "name": settings.APP_NAME,
+    "version": settings.APP_VERSION,
+    "debug": settings.DEBUG,
+    "api_prefix": settings.API_PREFIX
+}
+_STATIC_CACHE_HEADERS = {"Cache-Control": "public, max-age=60"}
+
+
 @app.get("/", tags=["Root"])
-async def root():
+async def root(response: Response):
     """Root endpoint with API information."""
-    return {
-        "message": f"Welcome to {settings.APP_NAME}",
-        "version": settings.APP_VERSION,
-        "docs": "/docs",
-        "health": f"{settings.API_PREFIX}/health"
-    }
+    response.headers.update(_STATIC_CACHE_HEADERS)
+    return _ROOT_INFO
 
 
 @app.get("/info", tags=["Root"])
-async def info():
+async def info(response: Response):
     """Get API information."""
-    return {
-        "name": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "debug": settings.DEBUG,
-        "api_prefix": settings.API_PREFIX
-    }
+    response.headers.update(_STATIC_CACHE_HEADERS)
+    return _API_INFO
 
 
 if __name__ == "__main__":
@@ -133,5 +174,7 @@ if __name__ == "__main__":
         host=settings.API_HOST,
         port=settings.API_PORT,
         reload=settings.DEBUG,
+        loop="uvloop",
+        http="httptools",
         log_level="debug" if settings.DEBUG else "info"
     )
\ No newline at end of file
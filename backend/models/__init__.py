@@ -44,7 +44,32 @@ from backend.models.rag import (
     IngestionResponse
 )
 
+# Minimal valid payloads for the request models validated on every POST
+_WARM_UP_PAYLOADS = (
+    (PlanGenerationRequest, {"user_id": "warm-up", "plan_type": "both"}),
+    (MeasurementLog, {"date": "2024-01-01", "waist_cm": 80}),
+    (WorkoutLog, {
+        "date": "2024-01-01", "workout_day_id": "day_1", "completed": True,
+        "exercises_completed": [], "duration_mins": 30, "energy_level": 5
+    }),
+    (CalorieLog, {
+        "date": "2024-01-01", "meals": [], "total_calories": 2000,
+        "total_protein": 100, "total_carbs": 200, "total_fats": 60,
+        "water_liters": 2
+    }),
+    (RAGQuery, {"user_id": "warm-up", "query": "warm-up", "plan_type": "both"}),
+    (IngestionRequest, {"documents": [{}], "document_type": "workout"}),
+)
+
+
+def warm_up_validators() -> None:
+    """Run each request model's validator once so cold workers don't pay on first request."""
+    for model, payload in _WARM_UP_PAYLOADS:
+        model.model_validate(payload)
+
+
 __all__ = [
+    "warm_up_validators",
     # User models
     "UserProfileCreate",
     "UserProfileUpdate", 
@@ -1,8 +1,8 @@
 # backend/models/plan.py
 """Plan-related Pydantic models."""
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, Literal
 from datetime import date
 from enum import Enum
 
@@ -20,6 +20,8 @@ class MuscleGroup(str, Enum):
 
 class Exercise(BaseModel):
     """Individual exercise model."""
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     muscle_group: MuscleGroup
     sets: int = Field(..., ge=1, le=10)
@@ -32,6 +34,8 @@ class Exercise(BaseModel):
 
 class WorkoutDay(BaseModel):
     """Single workout day model."""
+    model_config = ConfigDict(frozen=True)
+    
     day_name: str  # e.g., "Monday", "Day 1"
     focus: str  # e.g., "Push", "Legs", "Full Body"
     warm_up: List[str]
@@ -43,6 +47,8 @@ class WorkoutDay(BaseModel):
 
 class WorkoutPlan(BaseModel):
     """Complete workout plan model."""
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     user_id: str
     plan_name: str
@@ -59,6 +65,8 @@ class WorkoutPlan(BaseModel):
 
 class Meal(BaseModel):
     """Individual meal model."""
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     time: str  # e.g., "7:00 AM"
     items: List[str]
@@ -72,6 +80,8 @@ class Meal(BaseModel):
 
 class DailyDiet(BaseModel):
     """Single day diet plan model."""
+    model_config = ConfigDict(frozen=True)
+    
     day_name: str
     total_calories: int
     total_protein: float
@@ -84,6 +94,8 @@ class DailyDiet(BaseModel):
 
 class DietPlan(BaseModel):
     """Complete diet plan model."""
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     user_id: str
     plan_name: str
@@ -101,7 +113,7 @@ class DietPlan(BaseModel):
 class PlanGenerationRequest(BaseModel):
     """Request model for plan generation."""
     user_id: str
-    plan_type: str = Field(..., pattern="^(workout|diet|both)$")
+    plan_type: Literal["workout", "diet", "both"]
     additional_preferences: Optional[str] = None
     exclude_exercises: Optional[List[str]] = None
     exclude_foods: Optional[List[str]] = None
@@ -109,6 +121,8 @@ class PlanGenerationRequest(BaseModel):
 
 class PlanGenerationResponse(BaseModel):
     """Response model for plan generation."""
+    model_config = ConfigDict(frozen=True)
+    
     workout_plan: Optional[WorkoutPlan] = None
     diet_plan: Optional[DietPlan] = None
     recommendations: List[str]
@@ -1,7 +1,7 @@
 # backend/models/progress.py
 """Progress tracking Pydantic models."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict
 from datetime import date, datetime
 
@@ -50,6 +50,8 @@ class CalorieLog(BaseModel):
 
 class ProgressSummary(BaseModel):
     """Progress summary model."""
+    model_config = ConfigDict(frozen=True)
+    
     user_id: str
     period_start: date
     period_end: date
@@ -77,6 +79,8 @@ class ProgressSummary(BaseModel):
 
 class ProgressChartData(BaseModel):
     """Data for progress charts."""
+    model_config = ConfigDict(frozen=True)
+    
     weight_data: List[Dict]  # [{"date": "2024-01-01", "weight": 75.5}]
     calorie_data: List[Dict]  # [{"date": "2024-01-01", "intake": 2100, "target": 2000}]
     workout_data: List[Dict]  # [{"week": "Week 1", "completed": 4, "planned": 5}]
@@ -1,8 +1,8 @@
 # backend/models/rag.py
 """RAG-related Pydantic models."""
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, Literal
 from datetime import datetime
 
 
@@ -24,6 +24,8 @@ class RetrievalQuery(BaseModel):
 
 class RetrievedDocument(BaseModel):
     """Retrieved document model."""
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     content: str
     metadata: Dict
@@ -35,11 +37,13 @@ class RAGQuery(BaseModel):
     user_id: str
     query: str
     include_progress_context: bool = True
-    plan_type: str = Field(..., pattern="^(workout|diet|both)$")
+    plan_type: Literal["workout", "diet", "both"]
 
 
 class RAGResponse(BaseModel):
     """RAG response model."""
+    model_config = ConfigDict(frozen=True)
+    
     response: str
     sources: List[RetrievedDocument]
     confidence_score: float
@@ -56,6 +60,8 @@ class IngestionRequest(BaseModel):
 
 class IngestionResponse(BaseModel):
     """Data ingestion response model."""
+    model_config = ConfigDict(frozen=True)
+    
     success: bool
     documents_processed: int
     chunks_created: int
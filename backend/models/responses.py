@@ -1,7 +1,7 @@
 # backend/models/responses.py
 """Standard response models."""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Generic, TypeVar, Optional, List, Any
 from datetime import datetime
 
@@ -12,7 +12,7 @@ class BaseResponse(BaseModel):
     """Base response model."""
     success: bool = True
     message: str = "Operation successful"
-    timestamp: datetime = datetime.utcnow()
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
 class DataResponse(BaseResponse, Generic[T]):
@@ -26,6 +26,7 @@ class ListResponse(BaseResponse, Generic[T]):
     total: int = 0
     page: int = 1
     page_size: int = 10
+    next_cursor: Optional[str] = None
 
 
 class ErrorResponse(BaseModel):
@@ -34,13 +35,14 @@ class ErrorResponse(BaseModel):
     error: str
     message: str
     details: Optional[dict] = None
-    timestamp: datetime = datetime.utcnow()
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
 class PaginationParams(BaseModel):
-    """Pagination parameters."""
+    """Pagination parameters (offset via page/page_size, or keyset via cursor)."""
     page: int = 1
     page_size: int = 10
+    cursor: Optional[str] = None
     
     @property
     def offset(self) -> int:
@@ -57,7 +59,7 @@ class HealthCheckResponse(BaseModel):
     version: str
     database: str
     vectorstore: str
-    timestamp: datetime = datetime.utcnow()
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
 class StatsResponse(BaseModel):
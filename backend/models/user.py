@@ -1,8 +1,8 @@
 # backend/models/user.py
 """User-related Pydantic models for request/response validation."""
 
-from pydantic import BaseModel, Field, validator
-from typing import Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, Optional, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -47,18 +47,33 @@ class WorkoutLocation(str, Enum):
     BOTH = "both"
 
 
+# Field types for the request/response models. Literal members validate as
+# plain string comparisons; the Enum classes above stay as named constants
+# for the calorie service and the database column types.
+FitnessGoalValue = Literal["lean", "muscle_gain", "fat_loss"]
+ActivityLevelValue = Literal[
+    "sedentary", "lightly_active", "moderately_active", "very_active", "extremely_active"
+]
+DietaryPreferenceValue = Literal["indian_veg", "indian_non_veg", "vegan", "keto", "balanced"]
+ExperienceLevelValue = Literal["beginner", "intermediate", "advanced"]
+GenderValue = Literal["male", "female", "other"]
+WorkoutLocationValue = Literal["home", "gym", "both"]
+
+
 class UserProfileBase(BaseModel):
     """Base user profile model."""
+    model_config = ConfigDict(frozen=True, extra='forbid', str_strip_whitespace=True)
+    
     name: str = Field(..., min_length=2, max_length=100)
     age: int = Field(..., ge=16, le=80)
-    gender: Gender
+    gender: GenderValue
     height_cm: float = Field(..., ge=100, le=250)
     weight_kg: float = Field(..., ge=30, le=300)
-    fitness_goal: FitnessGoal
-    activity_level: ActivityLevel
-    dietary_preference: DietaryPreference
-    experience_level: ExperienceLevel
-    workout_location: WorkoutLocation
+    fitness_goal: FitnessGoalValue
+    activity_level: ActivityLevelValue
+    dietary_preference: DietaryPreferenceValue
+    experience_level: ExperienceLevelValue
+    workout_location: WorkoutLocationValue
     workout_days_per_week: int = Field(..., ge=1, le=7)
     medical_conditions: Optional[str] = None
     allergies: Optional[str] = None
@@ -66,25 +81,22 @@ class UserProfileBase(BaseModel):
 
 class UserProfileCreate(UserProfileBase):
     """Model for creating a new user profile."""
-    email: str = Field(..., pattern=r'^[\w\.-]+@[\w\.-]+\.\w+$')
-    
-    @validator('email')
-    def email_to_lowercase(cls, v):
-        return v.lower()
+    # Lowercased and matched inside pydantic-core, without a Python validator
+    email: Annotated[str, StringConstraints(to_lower=True, pattern=r'^[\w\.-]+@[\w\.-]+\.\w+$')]
 
 
 class UserProfileUpdate(BaseModel):
     """Model for updating user profile (all fields optional)."""
     name: Optional[str] = Field(None, min_length=2, max_length=100)
     age: Optional[int] = Field(None, ge=16, le=80)
-    gender: Optional[Gender] = None
+    gender: Optional[GenderValue] = None
     height_cm: Optional[float] = Field(None, ge=100, le=250)
     weight_kg: Optional[float] = Field(None, ge=30, le=300)
-    fitness_goal: Optional[FitnessGoal] = None
-    activity_level: Optional[ActivityLevel] = None
-    dietary_preference: Optional[DietaryPreference] = None
-    experience_level: Optional[ExperienceLevel] = None
-    workout_location: Optional[WorkoutLocation] = None
+    fitness_goal: Optional[FitnessGoalValue] = None
+    activity_level: Optional[ActivityLevelValue] = None
+    dietary_preference: Optional[DietaryPreferenceValue] = None
+    experience_level: Optional[ExperienceLevelValue] = None
+    workout_location: Optional[WorkoutLocationValue] = None
     workout_days_per_week: Optional[int] = Field(None, ge=1, le=7)
     medical_conditions: Optional[str] = None
     allergies: Optional[str] = None
@@ -100,12 +112,13 @@ class UserProfileResponse(UserProfileBase):
     bmr: float
     tdee: float
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserStats(BaseModel):
     """User statistics model."""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     bmi: float = Field(..., description="Body Mass Index")
     bmi_category: str
     bmr: float = Field(..., description="Basal Metabolic Rate")
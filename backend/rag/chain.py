@@ -1,19 +1,39 @@
 # backend/rag/chain.py
 """LangChain RAG chain implementation."""
 
-from typing import Dict, List, Optional, Any
+import asyncio
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import orjson
+from cachetools import TTLCache
 from backend.config import settings
-from backend.rag.prompts import get_rag_prompt, get_workout_prompt, get_diet_prompt
+from backend.rag.prompts import render_rag_messages, get_workout_prompt, get_diet_prompt
+
+logger = logging.getLogger(__name__)
 
 
 class FitnessRAGChain:
     """RAG chain for fitness and diet plan generation."""
     
+    __slots__ = (
+        "_retriever", "_llm", "_runnables", "_deterministic_runnables", "_calorie_calculator",
+        "_plan_cache", "_plan_cache_lock"
+    )
+    
     def __init__(self):
         """Initialize the RAG chain."""
         self._retriever = None
         self._llm = None
+        self._runnables: Optional[Dict[str, Any]] = None
+        self._deterministic_runnables: Optional[Dict[str, Any]] = None
         self._calorie_calculator = None
+        # Generated plans keyed by their full post-retrieval prompt inputs; repeat
+        # requests skip the LLM call, and entries expire so regenerations vary
+        self._plan_cache: TTLCache = TTLCache(maxsize=1024, ttl=600)
+        self._plan_cache_lock = threading.Lock()
     
     
     @property
@@ -29,6 +49,21 @@ class FitnessRAGChain:
             self._llm = self._initialize_llm()
         return self._llm
     
+    @property
+    def runnables(self) -> Dict[str, Any]:
+        """Prompt | LLM | parser pipelines, composed once and reused across calls."""
+        if self._runnables is None:
+            self._runnables = self._build_runnables(self.llm)
+        return self._runnables
+    
+    @property
+    def deterministic_runnables(self) -> Dict[str, Any]:
+        """The same pipelines on a temperature-0 LLM, for generations that may be replayed from the cache."""
+        if self._deterministic_runnables is None:
+            llm = self._initialize_llm(temperature=0) or self.llm
+            self._deterministic_runnables = self._build_runnables(llm)
+        return self._deterministic_runnables
+    
     @property
     def calorie_calculator(self):
         if self._calorie_calculator is None:
@@ -36,7 +71,7 @@ class FitnessRAGChain:
             self._calorie_calculator = CalorieCalculator()
         return self._calorie_calculator
     
-    def _initialize_llm(self):
+    def _initialize_llm(self, temperature: float = 0.3):
         """Initialize the LLM."""
         if settings.GOOGLE_API_KEY:
             try:
@@ -44,101 +79,141 @@ class FitnessRAGChain:
                 return ChatGoogleGenerativeAI(
                     model=settings.GEMINI_MODEL,
                     google_api_key=settings.GOOGLE_API_KEY,
-                    temperature=0.3,
+                    temperature=temperature,
                     max_output_tokens=4096,
                 )
             except Exception as e:
-                print(f"Warning: Could not initialize Gemini LLM: {e}")
+                logger.warning(f"Could not initialize Gemini LLM: {e}")
         
         # Return None if no LLM available
         return None
     
+    def _build_runnables(self, llm) -> Dict[str, Any]:
+        """Compose the generation pipelines for an initialized LLM."""
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.runnables import RunnableLambda
+        parser = StrOutputParser()
+        return {
+            "rag": RunnableLambda(render_rag_messages) | llm | parser,
+            "workout": get_workout_prompt() | llm | parser,
+            "diet": get_diet_prompt() | llm | parser
+        }
+    
     @property
     def is_available(self) -> bool:
         """Check if RAG chain is available."""
         return self.llm is not None
     
-    def generate_plan(self, user_profile: Dict, user_query: str,
-                      plan_type: str = "both",
-                      progress_data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Generate a personalized fitness/diet plan using RAG."""
+    async def agenerate_plan(self, user_profile: Dict, user_query: str,
+                             plan_type: str = "both",
+                             progress_data: Optional[Dict] = None,
+                             use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Generate a personalized fitness/diet plan using RAG, with concurrent
+        retrieval and a non-blocking LLM call.
+        
+        With use_cache=False a previously generated response is never reused;
+        the fresh one still replaces it in the cache.
+        """
+        context = await self.retriever.aretrieve_combined_context(
+            query=user_query,
+            user_profile=user_profile
+        )
+        stats, prompt_inputs = self._prepare_rag_plan(user_profile, user_query, progress_data, context)
         
-        # Calculate calorie and macro targets
-        stats = self.calorie_calculator.calculate_all(user_profile)
+        if not self.is_available:
+            return self._generate_fallback_response(user_profile, stats, prompt_inputs, context)
+        
+        cache_key = self._plan_cache_key("rag", prompt_inputs)
+        cached = self._get_cached_plan(cache_key) if use_cache else None
+        if cached is not None:
+            response = cached["response"]
+        else:
+            try:
+                response = await self._runnable("rag", use_cache).ainvoke(prompt_inputs)
+            except Exception as e:
+                logger.error(f"Error generating with LLM: {e}")
+                return self._generate_fallback_response(user_profile, stats, prompt_inputs, context)
+            self._cache_plan(cache_key, {"response": response})
         
-        # Retrieve relevant context
+        return {
+            "response": response,
+            **self._plan_metadata(user_profile, plan_type, stats, context)
+        }
+    
+    def generate_plan_stream(self, user_profile: Dict, user_query: str,
+                             plan_type: str = "both",
+                             progress_data: Optional[Dict] = None,
+                             use_cache: bool = True) -> Iterator[Tuple[str, Any]]:
+        """
+        Stream a personalized fitness/diet plan as (event, data) pairs.
+        
+        Yields one "metadata" event with sources, stats and follow-up questions,
+        then "token" events carrying response text as the LLM produces it. An
+        "error" event ends the stream if generation fails part-way through.
+        use_cache behaves as in agenerate_plan.
+        """
         context = self.retriever.retrieve_combined_context(
             query=user_query,
             user_profile=user_profile
         )
+        stats, prompt_inputs = self._prepare_rag_plan(user_profile, user_query, progress_data, context)
         
-        # Format context for prompt
-        workout_context = self._format_documents(context['workouts'])
-        diet_context = self._format_documents(context['diets'])
-        
-        # Format progress context
-        progress_context = self._format_progress(progress_data) if progress_data else "No previous progress data available."
-        
-        # If LLM is not available, return context-based response
         if not self.is_available:
-            return self._generate_fallback_response(
-                user_profile, stats, workout_context, diet_context, context
-            )
+            fallback = self._generate_fallback_response(user_profile, stats, prompt_inputs, context)
+            response = fallback.pop("response")
+            yield "metadata", fallback
+            yield "token", response
+            return
         
-        # Build prompt inputs
-        prompt_inputs = {
-            "user_name": user_profile.get("name", "User"),
-            "age": user_profile.get("age"),
-            "gender": user_profile.get("gender"),
-            "height_cm": user_profile.get("height_cm"),
-            "weight_kg": user_profile.get("weight_kg"),
-            "bmi": round(stats["bmi"], 1),
-            "fitness_goal": user_profile.get("fitness_goal"),
-            "activity_level": user_profile.get("activity_level"),
-            "experience_level": user_profile.get("experience_level"),
-            "workout_location": user_profile.get("workout_location"),
-            "workout_days": user_profile.get("workout_days_per_week"),
-            "dietary_preference": user_profile.get("dietary_preference"),
-            "medical_conditions": user_profile.get("medical_conditions", "None reported"),
-            "allergies": user_profile.get("allergies", "None reported"),
-            "daily_calories": stats["daily_calories"],
-            "protein_g": stats["protein_g"],
-            "carbs_g": stats["carbs_g"],
-            "fats_g": stats["fats_g"],
-            "progress_context": progress_context,
-            "workout_context": workout_context,
-            "diet_context": diet_context,
-            "user_query": user_query
-        }
+        yield "metadata", self._plan_metadata(user_profile, plan_type, stats, context)
         
+        cache_key = self._plan_cache_key("rag", prompt_inputs)
+        cached = self._get_cached_plan(cache_key) if use_cache else None
+        if cached is not None:
+            yield "token", cached["response"]
+            return
+        
+        chunks = []
         try:
-            # Generate response using RAG prompt
-            from langchain_core.output_parsers import StrOutputParser
-            prompt = get_rag_prompt()
-            chain = prompt | self.llm | StrOutputParser()
-            response = chain.invoke(prompt_inputs)
+            for chunk in self._runnable("rag", use_cache).stream(prompt_inputs):
+                chunks.append(chunk)
+                yield "token", chunk
+            self._cache_plan(cache_key, {"response": "".join(chunks)})
         except Exception as e:
-            print(f"Error generating with LLM: {e}")
-            return self._generate_fallback_response(
-                user_profile, stats, workout_context, diet_context, context
-            )
-        
-        # Extract sources
-        sources = self._extract_sources(context)
-        
-        # Generate follow-up questions
-        follow_ups = self._generate_follow_ups(user_profile, plan_type)
-        
+            logger.error(f"Error streaming with LLM: {e}")
+            if chunks:
+                yield "error", "Plan generation was interrupted"
+            else:
+                fallback = self._generate_fallback_response(user_profile, stats, prompt_inputs, context)
+                yield "token", fallback["response"]
+    
+    def _prepare_rag_plan(self, user_profile: Dict, user_query: str,
+                          progress_data: Optional[Dict], context: Dict) -> Tuple[Dict, Dict[str, Any]]:
+        """Calculate calorie/macro targets and build the RAG prompt inputs from retrieved context."""
+        stats = self.calorie_calculator.calculate_all(user_profile)
+        progress_context = self._format_progress(progress_data) if progress_data else "No previous progress data available."
+        prompt_inputs = self._build_rag_inputs(
+            user_profile, stats, progress_context,
+            self._format_documents(context['workouts']),
+            self._format_documents(context['diets']),
+            user_query
+        )
+        return stats, prompt_inputs
+    
+    def _plan_metadata(self, user_profile: Dict, plan_type: str,
+                       stats: Dict, context: Dict) -> Dict[str, Any]:
+        """Sources, stats and follow-up questions returned alongside a generated plan."""
         return {
-            "response": response,
-            "sources": sources,
+            "sources": self._extract_sources(context),
             "stats": stats,
-            "follow_up_questions": follow_ups
+            "follow_up_questions": self._generate_follow_ups(user_profile, plan_type)
         }
     
     def generate_workout_plan(self, user_profile: Dict,
-                               progress_data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Generate a detailed workout plan."""
+                               progress_data: Optional[Dict] = None,
+                               use_cache: bool = True) -> Dict[str, Any]:
+        """Generate a detailed workout plan; use_cache behaves as in agenerate_plan."""
         query = f"Complete {user_profile.get('workout_days_per_week')}-day workout plan for {user_profile.get('fitness_goal')} goal"
         
         context = self.retriever.retrieve_workout_context(
@@ -155,32 +230,44 @@ class FitnessRAGChain:
                 "sources": [{"id": doc.metadata.get("id"), "score": doc.metadata.get("score")} for doc in context]
             }
         
+        prompt_inputs = {
+            "user_profile": self._format_user_profile(user_profile),
+            "workout_context": workout_context,
+            "workout_days": user_profile.get("workout_days_per_week"),
+            "fitness_goal": user_profile.get("fitness_goal"),
+            "experience_level": user_profile.get("experience_level"),
+            "workout_location": user_profile.get("workout_location")
+        }
+        
+        cache_key = self._plan_cache_key("workout", prompt_inputs)
+        cached = self._get_cached_plan(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+        
         try:
-            from langchain_core.output_parsers import StrOutputParser
-            prompt = get_workout_prompt()
-            prompt_inputs = {
-                "user_profile": self._format_user_profile(user_profile),
-                "workout_context": workout_context,
-                "workout_days": user_profile.get("workout_days_per_week"),
-                "fitness_goal": user_profile.get("fitness_goal"),
-                "experience_level": user_profile.get("experience_level"),
-                "workout_location": user_profile.get("workout_location")
-            }
-            
-            chain = prompt | self.llm | StrOutputParser()
-            response = chain.invoke(prompt_inputs)
+            response = self._runnable("workout", use_cache).invoke(prompt_inputs)
         except Exception as e:
-            print(f"Error generating workout plan: {e}")
-            response = workout_context
+            logger.error(f"Error generating workout plan: {e}")
+            return {
+                "plan": workout_context,
+                "sources": [{"id": doc.metadata.get("id"), "score": doc.metadata.get("score")} for doc in context]
+            }
         
-        return {
+        return self._cache_plan(cache_key, {
             "plan": response,
             "sources": [{"id": doc.metadata.get("id"), "score": doc.metadata.get("score")} for doc in context]
-        }
+        })
+    
+    async def agenerate_workout_plan(self, user_profile: Dict,
+                                     progress_data: Optional[Dict] = None,
+                                     use_cache: bool = True) -> Dict[str, Any]:
+        """Async generate_workout_plan: retrieval and generation run in a worker thread."""
+        return await asyncio.to_thread(self.generate_workout_plan, user_profile, progress_data, use_cache)
     
     def generate_diet_plan(self, user_profile: Dict,
-                            progress_data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Generate a detailed diet plan."""
+                            progress_data: Optional[Dict] = None,
+                            use_cache: bool = True) -> Dict[str, Any]:
+        """Generate a detailed diet plan; use_cache behaves as in agenerate_plan."""
         stats = self.calorie_calculator.calculate_all(user_profile)
         
         query = f"Diet plan for {user_profile.get('dietary_preference')} with {stats['daily_calories']} calories"
@@ -200,36 +287,79 @@ class FitnessRAGChain:
                 "sources": [{"id": doc.metadata.get("id"), "score": doc.metadata.get("score")} for doc in context]
             }
         
+        prompt_inputs = {
+            "user_profile": self._format_user_profile(user_profile),
+            "diet_context": diet_context,
+            "daily_calories": stats["daily_calories"],
+            "protein_g": stats["protein_g"],
+            "carbs_g": stats["carbs_g"],
+            "fats_g": stats["fats_g"],
+            "dietary_preference": user_profile.get("dietary_preference"),
+            "allergies": user_profile.get("allergies", "None")
+        }
+        
+        cache_key = self._plan_cache_key("diet", prompt_inputs)
+        cached = self._get_cached_plan(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+        
         try:
-            from langchain_core.output_parsers import StrOutputParser
-            prompt = get_diet_prompt()
-            prompt_inputs = {
-                "user_profile": self._format_user_profile(user_profile),
-                "diet_context": diet_context,
-                "daily_calories": stats["daily_calories"],
-                "protein_g": stats["protein_g"],
-                "carbs_g": stats["carbs_g"],
-                "fats_g": stats["fats_g"],
-                "dietary_preference": user_profile.get("dietary_preference"),
-                "allergies": user_profile.get("allergies", "None")
-            }
-            
-            chain = prompt | self.llm | StrOutputParser()
-            response = chain.invoke(prompt_inputs)
+            response = self._runnable("diet", use_cache).invoke(prompt_inputs)
         except Exception as e:
-            print(f"Error generating diet plan: {e}")
-            response = diet_context
+            logger.error(f"Error generating diet plan: {e}")
+            return {
+                "plan": diet_context,
+                "stats": stats,
+                "sources": [{"id": doc.metadata.get("id"), "score": doc.metadata.get("score")} for doc in context]
+            }
         
-        return {
+        return self._cache_plan(cache_key, {
             "plan": response,
             "stats": stats,
             "sources": [{"id": doc.metadata.get("id"), "score": doc.metadata.get("score")} for doc in context]
-        }
+        })
+    
+    async def agenerate_diet_plan(self, user_profile: Dict,
+                                  progress_data: Optional[Dict] = None,
+                                  use_cache: bool = True) -> Dict[str, Any]:
+        """Async generate_diet_plan: retrieval and generation run in a worker thread."""
+        return await asyncio.to_thread(self.generate_diet_plan, user_profile, progress_data, use_cache)
+    
+    def _runnable(self, kind: str, use_cache: bool):
+        """
+        Pick the pipeline for one generation.
+        
+        Cache-eligible generations run at temperature 0, so replaying a cached
+        plan stands in for an equivalent new call; cache bypasses keep the
+        default temperature for a varied plan.
+        """
+        return (self.deterministic_runnables if use_cache else self.runnables)[kind]
+    
+    def _plan_cache_key(self, kind: str, inputs: Dict) -> bytes:
+        """Hash the plan kind and everything it is generated from; any change yields a new key."""
+        return hashlib.blake2b(
+            kind.encode() + orjson.dumps(inputs, option=orjson.OPT_SORT_KEYS),
+            digest_size=16
+        ).digest()
+    
+    def _get_cached_plan(self, cache_key: bytes) -> Optional[Dict[str, Any]]:
+        """Return a copy of a previously generated plan, if any."""
+        with self._plan_cache_lock:
+            cached = self._plan_cache.get(cache_key)
+        return dict(cached) if cached is not None else None
+    
+    def _cache_plan(self, cache_key: bytes, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Store an LLM-generated plan (fallbacks are never cached) and return it."""
+        with self._plan_cache_lock:
+            self._plan_cache[cache_key] = plan
+        return dict(plan)
     
     def _generate_fallback_response(self, user_profile: Dict, stats: Dict,
-                                     workout_context: str, diet_context: str,
+                                     prompt_inputs: Dict[str, Any],
                                      context: Dict) -> Dict[str, Any]:
         """Generate a fallback response when LLM is unavailable."""
+        workout_context = prompt_inputs["workout_context"]
+        diet_context = prompt_inputs["diet_context"]
         response = f"""
 # Personalized Fitness & Diet Plan for {user_profile.get('name', 'User')}
 
@@ -259,6 +389,34 @@ class FitnessRAGChain:
             ]
         }
     
+    def _build_rag_inputs(self, user_profile: Dict, stats: Dict, progress_context: str,
+                          workout_context: str, diet_context: str, user_query: str) -> Dict[str, Any]:
+        """Build the input variables for the main RAG prompt."""
+        return {
+            "user_name": user_profile.get("name", "User"),
+            "age": user_profile.get("age"),
+            "gender": user_profile.get("gender"),
+            "height_cm": user_profile.get("height_cm"),
+            "weight_kg": user_profile.get("weight_kg"),
+            "bmi": round(stats["bmi"], 1),
+            "fitness_goal": user_profile.get("fitness_goal"),
+            "activity_level": user_profile.get("activity_level"),
+            "experience_level": user_profile.get("experience_level"),
+            "workout_location": user_profile.get("workout_location"),
+            "workout_days": user_profile.get("workout_days_per_week"),
+            "dietary_preference": user_profile.get("dietary_preference"),
+            "medical_conditions": user_profile.get("medical_conditions", "None reported"),
+            "allergies": user_profile.get("allergies", "None reported"),
+            "daily_calories": stats["daily_calories"],
+            "protein_g": stats["protein_g"],
+            "carbs_g": stats["carbs_g"],
+            "fats_g": stats["fats_g"],
+            "progress_context": progress_context,
+            "workout_context": workout_context,
+            "diet_context": diet_context,
+            "user_query": user_query
+        }
+    
     def _format_documents(self, documents: List) -> str:
         """Format retrieved documents for prompt context."""
         if not documents:
@@ -297,42 +455,36 @@ class FitnessRAGChain:
         return "\n".join(parts) if parts else "No progress data available."
     
     def _format_user_profile(self, profile: Dict) -> str:
-        """Format user profile as readable string."""
-        return f"""
-- Name: {profile.get('name', 'User')}
-- Age: {profile.get('age')} years
-- Gender: {profile.get('gender')}
-- Height: {profile.get('height_cm')} cm
-- Weight: {profile.get('weight_kg')} kg
-- Goal: {profile.get('fitness_goal')}
-- Activity Level: {profile.get('activity_level')}
-- Experience: {profile.get('experience_level')}
-- Workout Location: {profile.get('workout_location')}
-- Days/Week: {profile.get('workout_days_per_week')}
-- Diet Preference: {profile.get('dietary_preference')}
-"""
+        """Format user profile as readable string (shared across workout and diet prompts)."""
+        return _render_user_profile((
+            profile.get('name', 'User'),
+            profile.get('age'),
+            profile.get('gender'),
+            profile.get('height_cm'),
+            profile.get('weight_kg'),
+            profile.get('fitness_goal'),
+            profile.get('activity_level'),
+            profile.get('experience_level'),
+            profile.get('workout_location'),
+            profile.get('workout_days_per_week'),
+            profile.get('dietary_preference')
+        ))
     
     def _extract_sources(self, context: Dict) -> List[Dict]:
         """Extract source information from retrieved documents."""
-        sources = []
-        
-        for doc in context.get('workouts', []):
-            sources.append({
-                "id": doc.metadata.get("id"),
-                "type": "workout",
-                "score": doc.metadata.get("score"),
-                "title": doc.metadata.get("title", "Workout Routine")
-            })
-        
-        for doc in context.get('diets', []):
-            sources.append({
-                "id": doc.metadata.get("id"),
-                "type": "diet",
-                "score": doc.metadata.get("score"),
-                "title": doc.metadata.get("title", "Diet Plan")
-            })
-        
-        return sources
+        return [
+            {
+                "id": metadata.get("id"),
+                "type": doc_type,
+                "score": metadata.get("score"),
+                "title": metadata.get("title", default_title)
+            }
+            for doc_type, default_title, docs in (
+                ("workout", "Workout Routine", context.get('workouts', [])),
+                ("diet", "Diet Plan", context.get('diets', []))
+            )
+            for metadata in (doc.metadata for doc in docs)
+        ]
     
     def _generate_follow_ups(self, user_profile: Dict, plan_type: str) -> List[str]:
         """Generate relevant follow-up questions."""
@@ -355,13 +507,49 @@ class FitnessRAGChain:
         return questions[:3]
 
 
+@lru_cache(maxsize=1024)
+def _render_user_profile(fields: Tuple) -> str:
+    """Render the prompt profile block; repeat generations for a user reuse the string."""
+    (name, age, gender, height_cm, weight_kg, fitness_goal, activity_level,
+     experience_level, workout_location, workout_days, dietary_preference) = fields
+    return f"""
+- Name: {name}
+- Age: {age} years
+- Gender: {gender}
+- Height: {height_cm} cm
+- Weight: {weight_kg} kg
+- Goal: {fitness_goal}
+- Activity Level: {activity_level}
+- Experience: {experience_level}
+- Workout Location: {workout_location}
+- Days/Week: {workout_days}
+- Diet Preference: {dietary_preference}
+"""
+
+
 # Singleton instance
 _rag_chain: Optional[FitnessRAGChain] = None
+_rag_chain_lock = threading.Lock()
 
 
 def get_rag_chain() -> FitnessRAGChain:
     """Get or create singleton RAG chain."""
     global _rag_chain
     if _rag_chain is None:
-        _rag_chain = FitnessRAGChain()
-    return _rag_chain
\ No newline at end of file
+        with _rag_chain_lock:
+            if _rag_chain is None:
+                _rag_chain = FitnessRAGChain()
+    return _rag_chain
+
+
+def warm_up_rag_components() -> None:
+    """Build the RAG singletons and their clients ahead of the first request."""
+    rag_chain = get_rag_chain()
+    if rag_chain.is_available:
+        rag_chain.runnables
+        rag_chain.deterministic_runnables
+    
+    retriever = rag_chain.retriever
+    if retriever.is_available:
+        retriever.pinecone_manager.get_index()
+        retriever.embedding_manager.warm_up()
\ No newline at end of file
@@ -1,13 +1,28 @@
 # backend/rag/embeddings.py
 """Embedding generation using Google GenAI or HuggingFace."""
 
-from typing import List, Optional
+import hashlib
+import logging
+import threading
+from array import array
+from typing import Callable, List, Optional
+from cachetools import LRUCache
 from backend.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Representative workout and diet queries run once through a local model at startup
+_WARM_UP_TEXTS = [
+    "beginner full body workout plan at home three days per week",
+    "high protein indian vegetarian diet plan for muscle gain"
+]
+
 
 class EmbeddingManager:
     """Manages embedding generation with multiple providers."""
     
+    __slots__ = ("provider", "_model_name", "_embeddings", "_cache", "_cache_lock")
+    
     def __init__(self, provider: str = "gemini"):
         """
         Initialize embedding manager.
@@ -16,7 +31,14 @@ class EmbeddingManager:
             provider: Either "gemini" or "huggingface"
         """
         self.provider = provider
+        self._model_name = None
         self._embeddings = None
+        # Vectors keyed by content hash; templated queries repeat across users.
+        # Stored as packed float32 arrays (4 bytes per dimension instead of a
+        # list of boxed Python floats); both providers emit float32 values, so
+        # the round trip is exact.
+        self._cache: LRUCache = LRUCache(maxsize=4096)
+        self._cache_lock = threading.Lock()
         self._initialize_embeddings()
     
     def _initialize_embeddings(self):
@@ -28,8 +50,9 @@ class EmbeddingManager:
                     model="models/embedding-001",
                     google_api_key=settings.GOOGLE_API_KEY
                 )
+                self._model_name = "models/embedding-001"
             except Exception as e:
-                print(f"Warning: Could not initialize Gemini embeddings: {e}")
+                logger.warning(f"Could not initialize Gemini embeddings: {e}")
                 self._use_huggingface_fallback()
         else:
             self._use_huggingface_fallback()
@@ -44,21 +67,75 @@ class EmbeddingManager:
                 encode_kwargs={'normalize_embeddings': True}
             )
             self.provider = "huggingface"
+            self._model_name = settings.HF_EMBEDDING_MODEL
         except Exception as e:
-            print(f"Warning: Could not initialize HuggingFace embeddings: {e}")
+            logger.warning(f"Could not initialize HuggingFace embeddings: {e}")
             self._embeddings = None
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for a list of documents."""
         if self._embeddings is None:
             raise RuntimeError("No embedding model available")
-        return self._embeddings.embed_documents(texts)
+        return self._embed_cached("document", texts, self._embeddings.embed_documents)
     
     def embed_query(self, text: str) -> List[float]:
         """Generate embedding for a single query."""
         if self._embeddings is None:
             raise RuntimeError("No embedding model available")
-        return self._embeddings.embed_query(text)
+        return self._embed_cached(
+            "query", [text], lambda texts: [self._embeddings.embed_query(texts[0])]
+        )[0]
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Generate query embeddings for several queries in one provider call."""
+        if self._embeddings is None:
+            raise RuntimeError("No embedding model available")
+        if self.provider == "gemini":
+            return self._embed_cached(
+                "query", texts,
+                lambda misses: self._embeddings.embed_documents(misses, task_type="retrieval_query")
+            )
+        return self._embed_cached("query", texts, self._embeddings.embed_documents)
+    
+    def _embed_cached(self, kind: str, texts: List[str],
+                      embed: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """Serve embeddings from the cache, calling `embed` once for the distinct misses."""
+        keys = [
+            hashlib.blake2b(
+                f"{self.provider}:{self._model_name}:{kind}:{text}".encode(), digest_size=16
+            ).digest()
+            for text in texts
+        ]
+        
+        found = {}
+        misses = {}
+        with self._cache_lock:
+            for key, text in zip(keys, texts):
+                vector = self._cache.get(key)
+                if vector is not None:
+                    found[key] = vector.tolist()
+                else:
+                    misses.setdefault(key, text)
+        
+        if misses:
+            vectors = embed(list(misses.values()))
+            found.update(zip(misses, vectors))
+            with self._cache_lock:
+                for key in misses:
+                    self._cache[key] = array("f", found[key])
+        
+        return [found[key] for key in keys]
+    
+    def warm_up(self) -> None:
+        """
+        Run one throwaway batch through a local model.
+        
+        Loads the tokenizer and does first-call setup now instead of on the
+        first user query. Remote providers are skipped, since warming them up
+        would only spend an API call. The results are not cached.
+        """
+        if self.provider == "huggingface" and self._embeddings is not None:
+            self._embeddings.embed_documents(_WARM_UP_TEXTS)
     
     @property
     def embeddings(self):
@@ -73,11 +150,14 @@ class EmbeddingManager:
 
 # Singleton instance
 _embedding_manager: Optional[EmbeddingManager] = None
+_embedding_manager_lock = threading.Lock()
 
 
 def get_embedding_manager(provider: str = "gemini") -> EmbeddingManager:
     """Get or create singleton embedding manager."""
     global _embedding_manager
     if _embedding_manager is None:
-        _embedding_manager = EmbeddingManager(provider)
+        with _embedding_manager_lock:
+            if _embedding_manager is None:
+                _embedding_manager = EmbeddingManager(provider)
     return _embedding_manager
\ No newline at end of file
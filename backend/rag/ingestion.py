@@ -1,16 +1,77 @@
 # backend/rag/ingestion.py
 """Data ingestion pipeline for fitness and diet knowledge base."""
 
-import json
-from typing import List, Dict, Optional
+import asyncio
+import io
+import logging
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from typing import Iterator, List, Dict, Optional
 from pathlib import Path
-import hashlib
-from datetime import datetime
+from datetime import datetime, timezone
+import orjson
+import xxhash
+
+logger = logging.getLogger(__name__)
+
+# Vectors per embed + upsert request (Pinecone's recommended upsert batch size)
+UPSERT_BATCH_SIZE = 100
+
+
+# Paragraph, line and sentence ends in the text built by _json_to_text
+_SPLIT_BOUNDARY = re.compile(r"\n\n|\n|\. ")
+
+
+class StructuredTextSplitter:
+    """Single-pass greedy splitter for the heading/bullet text produced from JSON items."""
+    
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+    
+    def split_text(self, text: str) -> List[str]:
+        """Pack boundary-delimited segments into chunks of at most chunk_size characters."""
+        chunks = []
+        current: deque = deque()
+        length = 0
+        
+        for segment in self._segments(text):
+            if current and length + len(segment) > self.chunk_size:
+                chunks.append("".join(current))
+                # Keep trailing segments (up to chunk_overlap chars) as the next chunk's lead-in
+                while current and (length > self.chunk_overlap
+                                   or length + len(segment) > self.chunk_size):
+                    length -= len(current.popleft())
+            current.append(segment)
+            length += len(segment)
+        
+        if current:
+            chunks.append("".join(current))
+        
+        return [chunk.strip() for chunk in chunks if chunk.strip()]
+    
+    def _segments(self, text: str) -> Iterator[str]:
+        """Yield text pieces ending at each boundary, hard-splitting any longer than chunk_size."""
+        start = 0
+        for match in _SPLIT_BOUNDARY.finditer(text):
+            yield from self._hard_split(text[start:match.end()])
+            start = match.end()
+        if start < len(text):
+            yield from self._hard_split(text[start:])
+    
+    def _hard_split(self, segment: str) -> Iterator[str]:
+        for i in range(0, len(segment), self.chunk_size):
+            yield segment[i:i + self.chunk_size]
 
 
 class FitnessDataIngester:
     """Ingests fitness and diet data into the vector store."""
     
+    __slots__ = ("_pinecone_manager", "_text_splitter")
+    
     def __init__(self):
         """Initialize the data ingester."""
         self._pinecone_manager = None
@@ -26,13 +87,19 @@ class FitnessDataIngester:
     @property
     def text_splitter(self):
         if self._text_splitter is None:
-            from langchain_text_splitters import RecursiveCharacterTextSplitter
             from backend.config import settings
-            self._text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=settings.CHUNK_SIZE,
-                chunk_overlap=settings.CHUNK_OVERLAP,
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
+            if settings.USE_RECURSIVE_SPLITTER:
+                from langchain_text_splitters import RecursiveCharacterTextSplitter
+                self._text_splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=settings.CHUNK_SIZE,
+                    chunk_overlap=settings.CHUNK_OVERLAP,
+                    separators=["\n\n", "\n", ". ", " ", ""]
+                )
+            else:
+                self._text_splitter = StructuredTextSplitter(
+                    chunk_size=settings.CHUNK_SIZE,
+                    chunk_overlap=settings.CHUNK_OVERLAP
+                )
         return self._text_splitter
     
     def ingest_all(self, data_dir: str = "data/raw") -> Dict[str, int]:
@@ -44,68 +111,103 @@ class FitnessDataIngester:
         }
         
         if not self.pinecone_manager.is_available:
-            print("Pinecone not available, skipping ingestion")
+            logger.warning("Pinecone not available, skipping ingestion")
             return stats
         
         # Ensure index exists
         self.pinecone_manager.create_index_if_not_exists(dimension=768)
         
+        # One timestamp for every chunk written by this pass
+        ingested_at = datetime.now(timezone.utc).isoformat()
+        
         # Ingest workout data
         workout_dir = Path(data_dir) / "workouts"
         if workout_dir.exists():
-            workout_chunks = self._ingest_directory(workout_dir, "workouts")
+            workout_chunks = self._ingest_directory(workout_dir, "workouts", ingested_at)
             stats["workouts_processed"] = len(list(workout_dir.glob("*.json")))
             stats["total_chunks"] += workout_chunks
         
         # Ingest diet data
         diet_dir = Path(data_dir) / "diets"
         if diet_dir.exists():
-            diet_chunks = self._ingest_directory(diet_dir, "diets")
+            diet_chunks = self._ingest_directory(diet_dir, "diets", ingested_at)
             stats["diets_processed"] = len(list(diet_dir.glob("*.json")))
             stats["total_chunks"] += diet_chunks
         
         return stats
     
-    def _ingest_directory(self, directory: Path, namespace: str) -> int:
+    def _ingest_directory(self, directory: Path, namespace: str,
+                          ingested_at: Optional[str] = None) -> int:
         """Ingest all files from a directory into specified namespace."""
+        from backend.config import settings
+        
+        ingested_at = ingested_at or datetime.now(timezone.utc).isoformat()
+        file_paths = list(directory.glob("*.json"))
+        if not file_paths:
+            return 0
+        
         total_chunks = 0
+        buffer: List[Dict] = []
+        upserts = []
         
-        for file_path in directory.glob("*.json"):
-            try:
-                chunks = self._process_json_file(file_path, namespace)
+        # Files are chunked concurrently; chunks from small files are pooled
+        # into full-size embed/upsert requests instead of one request per file
+        with ThreadPoolExecutor(max_workers=min(settings.INGESTION_WORKERS, len(file_paths))) as pool:
+            for chunks in pool.map(self._chunk_file, file_paths, repeat(namespace), repeat(ingested_at)):
                 total_chunks += len(chunks)
+                buffer.extend(chunks)
                 
-                if chunks:
-                    self.pinecone_manager.upsert_documents(chunks, namespace=namespace)
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+                while len(buffer) >= UPSERT_BATCH_SIZE:
+                    batch, buffer = buffer[:UPSERT_BATCH_SIZE], buffer[UPSERT_BATCH_SIZE:]
+                    upserts.append(
+                        pool.submit(self.pinecone_manager.upsert_documents, batch, namespace)
+                    )
+            
+            if buffer:
+                upserts.append(
+                    pool.submit(self.pinecone_manager.upsert_documents, buffer, namespace)
+                )
+            
+            for upsert in upserts:
+                upsert.result()
         
         return total_chunks
     
-    def _process_json_file(self, file_path: Path, doc_type: str) -> List[Dict]:
+    def _chunk_file(self, file_path: Path, namespace: str, ingested_at: str) -> List[Dict]:
+        """Chunk a single file, logging and skipping it on error."""
+        try:
+            return self._process_json_file(file_path, namespace, ingested_at)
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
+            return []
+    
+    def _process_json_file(self, file_path: Path, doc_type: str,
+                           ingested_at: Optional[str] = None) -> List[Dict]:
         """Process a JSON file and return document chunks."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = orjson.loads(file_path.read_bytes())
+        ingested_at = ingested_at or datetime.now(timezone.utc).isoformat()
         
         chunks = []
         
         if isinstance(data, list):
             for idx, item in enumerate(data):
-                item_chunks = self._chunk_json_item(item, file_path.stem, idx, doc_type)
+                item_chunks = self._chunk_json_item(item, file_path.stem, idx, doc_type, ingested_at)
                 chunks.extend(item_chunks)
         elif isinstance(data, dict):
             if "items" in data:
                 for idx, item in enumerate(data["items"]):
-                    item_chunks = self._chunk_json_item(item, file_path.stem, idx, doc_type)
+                    item_chunks = self._chunk_json_item(item, file_path.stem, idx, doc_type, ingested_at)
                     chunks.extend(item_chunks)
             else:
-                item_chunks = self._chunk_json_item(data, file_path.stem, 0, doc_type)
+                item_chunks = self._chunk_json_item(data, file_path.stem, 0, doc_type, ingested_at)
                 chunks.extend(item_chunks)
         
         return chunks
     
-    def _chunk_json_item(self, item: Dict, source_file: str, idx: int, doc_type: str) -> List[Dict]:
+    def _chunk_json_item(self, item: Dict, source_file: str, idx: int, doc_type: str,
+                         ingested_at: Optional[str] = None) -> List[Dict]:
         """Convert a JSON item to document chunks."""
+        ingested_at = ingested_at or datetime.now(timezone.utc).isoformat()
         text_content = self._json_to_text(item, doc_type)
         text_chunks = self.text_splitter.split_text(text_content)
         
@@ -123,7 +225,7 @@ class FitnessDataIngester:
                 "dietary_type": item.get("dietary_type", item.get("preference", "all")),
                 "goal": item.get("goal", "general"),
                 "chunk_index": chunk_idx,
-                "ingested_at": datetime.utcnow().isoformat()
+                "ingested_at": ingested_at
             }
             
             chunks.append({
@@ -136,45 +238,46 @@ class FitnessDataIngester:
     
     def _json_to_text(self, item: Dict, doc_type: str) -> str:
         """Convert a JSON item to readable text format."""
-        parts = [f"# {item.get('name', item.get('title', 'Item'))}"]
+        # Written straight into one buffer; every line after the heading starts with "\n"
+        buf = io.StringIO()
+        write = buf.write
+        write(f"# {item.get('name', item.get('title', 'Item'))}")
         
         if item.get('description'):
-            parts.append(f"\n{item['description']}")
+            write(f"\n\n{item['description']}")
         
         # Add all relevant fields
         for key in ['level', 'goal', 'location', 'duration', 'calories']:
             if item.get(key):
-                parts.append(f"{key.title()}: {item[key]}")
+                write(f"\n{key.title()}: {item[key]}")
         
         # Handle exercises
         if item.get('exercises'):
-            parts.append("\n## Exercises:")
+            write("\n\n## Exercises:")
             for exercise in item['exercises']:
-                ex_text = f"- {exercise.get('name', 'Exercise')}"
+                write(f"\n- {exercise.get('name', 'Exercise')}")
                 if exercise.get('sets'):
-                    ex_text += f": {exercise['sets']} sets"
+                    write(f": {exercise['sets']} sets")
                 if exercise.get('reps'):
-                    ex_text += f" x {exercise['reps']}"
-                parts.append(ex_text)
+                    write(f" x {exercise['reps']}")
         
         # Handle meals
         if item.get('meals'):
-            parts.append("\n## Meals:")
+            write("\n\n## Meals:")
             for meal in item['meals']:
-                parts.append(f"\n### {meal.get('name', 'Meal')}")
+                write(f"\n\n### {meal.get('name', 'Meal')}")
                 if meal.get('items'):
                     for food in meal['items']:
                         if isinstance(food, dict):
-                            parts.append(f"- {food.get('name', 'Food')}: {food.get('portion', '')}")
+                            write(f"\n- {food.get('name', 'Food')}: {food.get('portion', '')}")
                         else:
-                            parts.append(f"- {food}")
+                            write(f"\n- {food}")
         
-        return "\n".join(parts)
+        return buf.getvalue()
     
     def _generate_chunk_id(self, source: str, item_idx: int, chunk_idx: int) -> str:
         """Generate a unique chunk ID."""
-        content = f"{source}_{item_idx}_{chunk_idx}"
-        return hashlib.md5(content.encode()).hexdigest()
+        return xxhash.xxh3_64_hexdigest(f"{source}_{item_idx}_{chunk_idx}".encode())
     
     def ingest_single_document(self, document: Dict, doc_type: str) -> int:
         """Ingest a single document."""
@@ -189,19 +292,59 @@ class FitnessDataIngester:
         
         return len(chunks)
     
+    def ingest_batch(self, documents: List[Dict], doc_type: str) -> int:
+        """Ingest several documents as concurrent full-size embed + upsert batches."""
+        if not self.pinecone_manager.is_available:
+            return 0
+        
+        namespace = f"{doc_type}s"
+        ingested_at = datetime.now(timezone.utc).isoformat()
+        chunks = []
+        for idx, document in enumerate(documents):
+            chunks.extend(self._chunk_json_item(document, "manual_entry", idx, namespace, ingested_at))
+        
+        self._upsert_batches(chunks, namespace)
+        return len(chunks)
+    
+    async def aingest_batch(self, documents: List[Dict], doc_type: str) -> int:
+        """Ingest several documents on a worker thread, keeping the event loop free."""
+        return await asyncio.to_thread(self.ingest_batch, documents, doc_type)
+    
+    def _upsert_batches(self, chunks: List[Dict], namespace: str) -> None:
+        """Embed and upsert chunks in full-size batches, overlapping the requests."""
+        from backend.config import settings
+        
+        batches = [
+            chunks[i:i + UPSERT_BATCH_SIZE] for i in range(0, len(chunks), UPSERT_BATCH_SIZE)
+        ]
+        if len(batches) <= 1:
+            for batch in batches:
+                self.pinecone_manager.upsert_documents(batch, namespace=namespace)
+            return
+        
+        with ThreadPoolExecutor(max_workers=min(settings.INGESTION_WORKERS, len(batches))) as pool:
+            list(pool.map(self.pinecone_manager.upsert_documents, batches, repeat(namespace)))
+    
     def clear_namespace(self, namespace: str):
         """Clear all data from a namespace."""
         if self.pinecone_manager.is_available:
             self.pinecone_manager.delete_namespace(namespace)
+    
+    async def aclear_namespace(self, namespace: str):
+        """Clear a namespace on a worker thread."""
+        await asyncio.to_thread(self.clear_namespace, namespace)
 
 
 # Singleton instance
 _ingester: Optional[FitnessDataIngester] = None
+_ingester_lock = threading.Lock()
 
 
 def get_ingester() -> FitnessDataIngester:
     """Get or create singleton ingester."""
     global _ingester
     if _ingester is None:
-        _ingester = FitnessDataIngester()
+        with _ingester_lock:
+            if _ingester is None:
+                _ingester = FitnessDataIngester()
     return _ingester
\ No newline at end of file
@@ -1,11 +1,18 @@
 # backend/rag/prompts.py
 """Prompt templates for RAG-based generation."""
 
-from langchain_core.prompts import PromptTemplate
+from functools import lru_cache
+from typing import Dict, List
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 
 
-# Main RAG prompt template
-RAG_PROMPT_TEMPLATE = """You are an expert AI Fitness and Diet Planner. Using ONLY the retrieved workout routines, diet charts, and user progress data below, generate a safe, personalized fitness and diet plan.
+# Main RAG prompt, split so the static instructions form an identical leading
+# prefix on every call (provider-side prompt caching). The retrieved context,
+# shared by users with the same goal/level/location/diet, comes next so the
+# cached prefix extends across them; per-user data follows, with the progress
+# context and the request itself last
+RAG_SYSTEM_PROMPT = """You are an expert AI Fitness and Diet Planner. Using ONLY the retrieved workout routines, diet charts, and user progress data provided, generate a safe, personalized fitness and diet plan.
 
 CRITICAL RULES:
 1. ONLY use information from the provided context documents
@@ -14,6 +21,15 @@ CRITICAL RULES:
 4. NEVER provide medical advice
 5. Always prioritize safety
 
+Generate a comprehensive, personalized response addressing the user's request. Include specific exercises with sets/reps and meals with portions. Cite your sources."""
+
+
+RAG_USER_PROMPT = """=== RETRIEVED WORKOUT CONTEXT ===
+{workout_context}
+
+=== RETRIEVED DIET CONTEXT ===
+{diet_context}
+
 === USER PROFILE ===
 Name: {user_name}
 Age: {age} years | Gender: {gender}
@@ -34,18 +50,8 @@ Protein: {protein_g}g | Carbohydrates: {carbs_g}g | Fats: {fats_g}g
 === USER PROGRESS ===
 {progress_context}
 
-=== RETRIEVED WORKOUT CONTEXT ===
-{workout_context}
-
-=== RETRIEVED DIET CONTEXT ===
-{diet_context}
-
 === USER REQUEST ===
-{user_query}
-
-Generate a comprehensive, personalized response addressing the user's request. Include specific exercises with sets/reps and meals with portions. Cite your sources.
-
-Response:"""
+{user_query}"""
 
 
 WORKOUT_PLAN_PROMPT = """Based on the retrieved workout context and user profile, create a detailed weekly workout plan.
@@ -100,23 +106,33 @@ Generate a daily meal plan that:
 Daily Meal Plan:"""
 
 
-def get_rag_prompt() -> PromptTemplate:
-    """Get the main RAG prompt template."""
-    return PromptTemplate(
-        template=RAG_PROMPT_TEMPLATE,
-        input_variables=[
-            "user_name", "age", "gender", "height_cm", "weight_kg", "bmi",
-            "fitness_goal", "activity_level", "experience_level",
-            "workout_location", "workout_days", "dietary_preference",
-            "medical_conditions", "allergies", "daily_calories",
-            "protein_g", "carbs_g", "fats_g", "progress_context",
-            "workout_context", "diet_context", "user_query"
-        ]
-    )
+# The system message never changes, so one instance is shared by every render
+_RAG_SYSTEM_MESSAGE = SystemMessage(content=RAG_SYSTEM_PROMPT)
+
+
+def render_rag_messages(inputs: Dict) -> List[BaseMessage]:
+    """
+    Render the main RAG prompt straight to chat messages.
+    
+    Equivalent to get_rag_prompt().format_messages(**inputs), but fills the
+    fixed user template with one str.format_map call instead of going through
+    ChatPromptTemplate's per-call input validation.
+    """
+    return [_RAG_SYSTEM_MESSAGE, HumanMessage(content=RAG_USER_PROMPT.format_map(inputs))]
+
+
+@lru_cache(maxsize=1)
+def get_rag_prompt() -> ChatPromptTemplate:
+    """Get the main RAG prompt template (static system prefix + per-request user message)."""
+    return ChatPromptTemplate.from_messages([
+        ("system", RAG_SYSTEM_PROMPT),
+        ("human", RAG_USER_PROMPT)
+    ])
 
 
+@lru_cache(maxsize=1)
 def get_workout_prompt() -> PromptTemplate:
-    """Get workout plan generation prompt."""
+    """Get workout plan generation prompt (built once; templates are immutable)."""
     return PromptTemplate(
         template=WORKOUT_PLAN_PROMPT,
         input_variables=[
@@ -126,8 +142,9 @@ def get_workout_prompt() -> PromptTemplate:
     )
 
 
+@lru_cache(maxsize=1)
 def get_diet_prompt() -> PromptTemplate:
-    """Get diet plan generation prompt."""
+    """Get diet plan generation prompt (built once; templates are immutable)."""
     return PromptTemplate(
         template=DIET_PLAN_PROMPT,
         input_variables=[
@@ -1,9 +1,146 @@
 # backend/rag/retriever.py
 """Document retrieval with context awareness."""
 
-from typing import List, Dict, Optional
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+import orjson
+from cachetools import TTLCache
 from langchain_core.documents import Document
 
+logger = logging.getLogger(__name__)
+
+# Runs the diet half of combined retrievals alongside the workout query
+_retrieval_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+# Returned when RAG is unavailable; built once and shared, since callers only read them
+_FALLBACK_WORKOUT_DOCS: Tuple[Document, ...] = (
+    Document(
+        page_content="""
+                # General Workout Guidelines
+                
+                ## Beginner Full Body Workout (3 days/week)
+                - Squats: 3 sets x 10-12 reps
+                - Push-ups: 3 sets x 8-12 reps
+                - Dumbbell Rows: 3 sets x 10 reps each arm
+                - Lunges: 3 sets x 10 reps each leg
+                - Plank: 3 sets x 30 seconds
+                
+                ## Intermediate Split (4 days/week)
+                Day 1: Chest & Triceps
+                Day 2: Back & Biceps
+                Day 3: Rest
+                Day 4: Legs
+                Day 5: Shoulders & Core
+                
+                ## Important Notes
+                - Always warm up for 5-10 minutes
+                - Rest 60-90 seconds between sets
+                - Stay hydrated
+                - Progressive overload is key
+                """,
+        metadata={'type': 'workout', 'source': 'fallback', 'score': 0.5}
+    ),
+)
+
+_FALLBACK_DIET_DOCS: Tuple[Document, ...] = (
+    Document(
+        page_content="""
+                # General Diet Guidelines
+                
+                ## Indian Vegetarian High Protein Foods
+                - Paneer: 18g protein per 100g
+                - Dal (Lentils): 9g protein per 100g
+                - Chickpeas: 19g protein per 100g
+                - Greek Yogurt: 10g protein per 100g
+                - Soy chunks: 52g protein per 100g
+                
+                ## Sample Meal Plan (2000 kcal)
+                Breakfast: Paneer bhurji with 2 rotis (500 kcal)
+                Snack: Sprouts chaat (200 kcal)
+                Lunch: Rajma chawal with salad (600 kcal)
+                Snack: Protein shake with banana (250 kcal)
+                Dinner: Dal with roti and vegetables (450 kcal)
+                
+                ## Macro Split for Muscle Gain
+                - Protein: 30% (150g)
+                - Carbs: 45% (225g)
+                - Fats: 25% (55g)
+                """,
+        metadata={'type': 'diet', 'source': 'fallback', 'score': 0.5}
+    ),
+)
+
+
+class SemanticQueryCache:
+    """Vector query results keyed by exact query text, with near-duplicate fallback.
+    
+    Entries are scoped by namespace, filter and top_k, so a cached result is only
+    ever reused for a query against the same slice of the index.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: int = 300,
+                 threshold: float = 0.95, recent_per_scope: int = 64):
+        self.threshold = threshold
+        self._results: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Per scope: (unit query vector, result key) for the most recent misses
+        self._recent: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._recent_per_scope = recent_per_scope
+        self._lock = threading.Lock()
+    
+    def get_exact(self, scope: bytes, query: str) -> Optional[List[Dict]]:
+        """Return results cached for exactly this query text, without needing its embedding."""
+        with self._lock:
+            return self._results.get(self._key(scope, query))
+    
+    def get(self, scope: bytes, query: str, embedding: List[float]) -> Optional[List[Dict]]:
+        """Return results for this query, or for a prior query with cosine >= threshold."""
+        with self._lock:
+            results = self._results.get(self._key(scope, query))
+            recent = list(self._recent.get(scope, ()))
+        if results is not None or not recent:
+            return results
+        
+        vector = self._unit(embedding)
+        if vector is None:
+            return None
+        
+        similarities = np.stack([unit for unit, _ in recent]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        
+        with self._lock:
+            return self._results.get(recent[best][1])
+    
+    def put(self, scope: bytes, query: str, embedding: List[float], results: List[Dict]) -> None:
+        """Cache results and remember the query vector for near-duplicate lookups."""
+        key = self._key(scope, query)
+        vector = self._unit(embedding)
+        with self._lock:
+            self._results[key] = results
+            if vector is not None:
+                recent = self._recent.get(scope)
+                if recent is None:
+                    recent = self._recent[scope] = deque(maxlen=self._recent_per_scope)
+                recent.append((vector, key))
+    
+    @staticmethod
+    def _key(scope: bytes, query: str) -> bytes:
+        return hashlib.blake2b(scope + b"\0" + query.encode(), digest_size=16).digest()
+    
+    @staticmethod
+    def _unit(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
 
 class FitnessRetriever:
     """Custom retriever for fitness and diet documents."""
@@ -12,6 +149,10 @@ class FitnessRetriever:
         """Initialize the retriever."""
         self._pinecone_manager = None
         self._embedding_manager = None
+        # Both backends stay up once initialized, so a positive check is kept
+        self._available = False
+        # Profiles sharing (goal, level, location, preference) issue near-identical queries
+        self._query_cache = SemanticQueryCache()
     
     @property
     def pinecone_manager(self):
@@ -30,11 +171,14 @@ class FitnessRetriever:
     @property
     def is_available(self) -> bool:
         """Check if retriever is available."""
-        return (self.pinecone_manager.is_available and 
-                self.embedding_manager.is_available)
+        if not self._available:
+            self._available = (self.pinecone_manager.is_available and
+                               self.embedding_manager.is_available)
+        return self._available
     
     def retrieve_workout_context(self, query: str, user_profile: Dict,
-                                  top_k: int = 5) -> List[Document]:
+                                 top_k: int = 5,
+                                 query_embedding: Optional[List[float]] = None) -> List[Document]:
         """Retrieve relevant workout documents based on user profile."""
         if not self.is_available:
             return self._get_fallback_workout_docs()
@@ -42,18 +186,16 @@ class FitnessRetriever:
         filter_dict = self._build_workout_filter(user_profile)
         enhanced_query = self._enhance_query(query, user_profile, "workout")
         
-        results = self.pinecone_manager.query(
-            query=enhanced_query,
-            top_k=top_k,
-            namespace="workouts",
-            filter_dict=filter_dict
+        results = self._query_cached(
+            enhanced_query, top_k, "workouts", filter_dict, query_embedding
         )
         
         docs = self._results_to_documents(results)
         return docs if docs else self._get_fallback_workout_docs()
     
     def retrieve_diet_context(self, query: str, user_profile: Dict,
-                               top_k: int = 5) -> List[Document]:
+                              top_k: int = 5,
+                              query_embedding: Optional[List[float]] = None) -> List[Document]:
         """Retrieve relevant diet documents based on user profile."""
         if not self.is_available:
             return self._get_fallback_diet_docs()
@@ -61,11 +203,8 @@ class FitnessRetriever:
         filter_dict = self._build_diet_filter(user_profile)
         enhanced_query = self._enhance_query(query, user_profile, "diet")
         
-        results = self.pinecone_manager.query(
-            query=enhanced_query,
-            top_k=top_k,
-            namespace="diets",
-            filter_dict=filter_dict
+        results = self._query_cached(
+            enhanced_query, top_k, "diets", filter_dict, query_embedding
         )
         
         docs = self._results_to_documents(results)
@@ -73,59 +212,131 @@ class FitnessRetriever:
     
     def retrieve_combined_context(self, query: str, user_profile: Dict,
                                    top_k_each: int = 3) -> Dict[str, List[Document]]:
-        """Retrieve both workout and diet context."""
-        workout_docs = self.retrieve_workout_context(query, user_profile, top_k_each)
-        diet_docs = self.retrieve_diet_context(query, user_profile, top_k_each)
+        """Retrieve both workout and diet context, querying the two namespaces concurrently."""
+        workout_embedding, diet_embedding = self._embed_combined_queries(query, user_profile, top_k_each)
+        diet_future = _retrieval_executor.submit(
+            self.retrieve_diet_context, query, user_profile, top_k_each, diet_embedding
+        )
+        workout_docs = self.retrieve_workout_context(
+            query, user_profile, top_k_each, workout_embedding
+        )
+        diet_docs = diet_future.result()
         
         return {
             'workouts': workout_docs,
             'diets': diet_docs
         }
     
-    def _build_workout_filter(self, user_profile: Dict) -> Optional[Dict]:
-        """Build Pinecone filter for workouts."""
-        filters = {}
+    async def aretrieve_combined_context(self, query: str, user_profile: Dict,
+                                         top_k_each: int = 3) -> Dict[str, List[Document]]:
+        """Retrieve workout and diet context concurrently."""
+        workout_embedding, diet_embedding = await asyncio.to_thread(
+            self._embed_combined_queries, query, user_profile, top_k_each
+        )
+        workout_docs, diet_docs = await asyncio.gather(
+            asyncio.to_thread(self.retrieve_workout_context, query, user_profile,
+                              top_k_each, workout_embedding),
+            asyncio.to_thread(self.retrieve_diet_context, query, user_profile,
+                              top_k_each, diet_embedding)
+        )
         
-        if user_profile.get('experience_level'):
-            filters['experience_level'] = {"$eq": user_profile['experience_level']}
+        return {
+            'workouts': workout_docs,
+            'diets': diet_docs
+        }
+    
+    def _embed_combined_queries(self, query: str, user_profile: Dict,
+                                top_k: int) -> Tuple[Optional[List[float]], Optional[List[float]]]:
+        """Embed the workout and diet variants of a query in one round trip.
         
-        if user_profile.get('workout_location'):
-            location = user_profile['workout_location']
-            if location != 'both':
-                filters['location'] = {"$eq": location}
+        Variants whose exact text is already cached are not embedded; their
+        retrieval is served from the cache.
+        """
+        if not self.is_available:
+            return None, None
+        
+        variants = [
+            (self._enhance_query(query, user_profile, "workout"), "workouts",
+             self._build_workout_filter(user_profile)),
+            (self._enhance_query(query, user_profile, "diet"), "diets",
+             self._build_diet_filter(user_profile))
+        ]
+        misses = [
+            idx for idx, (enhanced_query, namespace, filter_dict) in enumerate(variants)
+            if self._query_cache.get_exact(
+                self._cache_scope(namespace, filter_dict, top_k), enhanced_query
+            ) is None
+        ]
+        embeddings = [None, None]
+        if not misses:
+            return None, None
         
-        return filters if filters else None
+        try:
+            batch = self.embedding_manager.embed_queries([variants[idx][0] for idx in misses])
+            for idx, embedding in zip(misses, batch):
+                embeddings[idx] = embedding
+        except Exception as e:
+            # Each retrieval embeds its own query instead
+            logger.error(f"Error batch-embedding queries: {e}")
+        return embeddings[0], embeddings[1]
     
-    def _build_diet_filter(self, user_profile: Dict) -> Optional[Dict]:
-        """Build Pinecone filter for diets."""
-        filters = {}
+    def _query_cached(self, enhanced_query: str, top_k: int, namespace: str,
+                      filter_dict: Optional[Dict],
+                      query_embedding: Optional[List[float]]) -> List[Dict]:
+        """Query Pinecone through the semantic cache; empty (failed) results are not cached."""
+        scope = self._cache_scope(namespace, filter_dict, top_k)
+        
+        # Exact repeats are answered before paying for an embedding
+        results = self._query_cache.get_exact(scope, enhanced_query)
+        if results is not None:
+            return results
         
-        if user_profile.get('dietary_preference'):
-            filters['dietary_type'] = {"$eq": user_profile['dietary_preference']}
+        if query_embedding is None:
+            try:
+                query_embedding = self.embedding_manager.embed_query(enhanced_query)
+            except Exception as e:
+                logger.error(f"Error embedding query: {e}")
+                return []
+        
+        results = self._query_cache.get(scope, enhanced_query, query_embedding)
+        if results is None:
+            results = self.pinecone_manager.query(
+                query=enhanced_query,
+                top_k=top_k,
+                namespace=namespace,
+                filter_dict=filter_dict,
+                query_embedding=query_embedding
+            )
+            if results:
+                self._query_cache.put(scope, enhanced_query, query_embedding, results)
         
-        return filters if filters else None
+        return results
+    
+    @staticmethod
+    def _cache_scope(namespace: str, filter_dict: Optional[Dict], top_k: int) -> bytes:
+        """Cache scope for a query against one namespace, filter and top_k."""
+        return orjson.dumps([namespace, filter_dict, top_k], option=orjson.OPT_SORT_KEYS)
+    
+    def _build_workout_filter(self, user_profile: Dict) -> Optional[Dict]:
+        """Build Pinecone filter for workouts."""
+        return _workout_filter(
+            user_profile.get('experience_level'), user_profile.get('workout_location')
+        )
+    
+    def _build_diet_filter(self, user_profile: Dict) -> Optional[Dict]:
+        """Build Pinecone filter for diets."""
+        return _diet_filter(user_profile.get('dietary_preference'))
     
     def _enhance_query(self, query: str, user_profile: Dict, context_type: str) -> str:
         """Enhance query with user profile context."""
-        enhancements = []
-        
-        if context_type == "workout":
-            if user_profile.get('fitness_goal'):
-                enhancements.append(f"Goal: {user_profile['fitness_goal']}")
-            if user_profile.get('experience_level'):
-                enhancements.append(f"Level: {user_profile['experience_level']}")
-            if user_profile.get('workout_location'):
-                enhancements.append(f"Location: {user_profile['workout_location']}")
-        
-        elif context_type == "diet":
-            if user_profile.get('dietary_preference'):
-                enhancements.append(f"Preference: {user_profile['dietary_preference']}")
-            if user_profile.get('fitness_goal'):
-                enhancements.append(f"Goal: {user_profile['fitness_goal']}")
-        
-        if enhancements:
-            return f"{query} [{' | '.join(enhancements)}]"
-        return query
+        suffix = _profile_suffix(
+            context_type,
+            user_profile.get('fitness_goal'),
+            user_profile.get('experience_level'),
+            user_profile.get('workout_location'),
+            user_profile.get('dietary_preference')
+        )
+        return f"{query} [{suffix}]" if suffix else query
     
     def _results_to_documents(self, results: List[Dict]) -> List[Document]:
         """Convert query results to LangChain documents."""
@@ -144,73 +355,68 @@ class FitnessRetriever:
     
     def _get_fallback_workout_docs(self) -> List[Document]:
         """Get fallback workout documents when RAG is unavailable."""
-        return [
-            Document(
-                page_content="""
-                # General Workout Guidelines
-                
-                ## Beginner Full Body Workout (3 days/week)
-                - Squats: 3 sets x 10-12 reps
-                - Push-ups: 3 sets x 8-12 reps
-                - Dumbbell Rows: 3 sets x 10 reps each arm
-                - Lunges: 3 sets x 10 reps each leg
-                - Plank: 3 sets x 30 seconds
-                
-                ## Intermediate Split (4 days/week)
-                Day 1: Chest & Triceps
-                Day 2: Back & Biceps
-                Day 3: Rest
-                Day 4: Legs
-                Day 5: Shoulders & Core
-                
-                ## Important Notes
-                - Always warm up for 5-10 minutes
-                - Rest 60-90 seconds between sets
-                - Stay hydrated
-                - Progressive overload is key
-                """,
-                metadata={'type': 'workout', 'source': 'fallback', 'score': 0.5}
-            )
-        ]
+        return list(_FALLBACK_WORKOUT_DOCS)
     
     def _get_fallback_diet_docs(self) -> List[Document]:
         """Get fallback diet documents when RAG is unavailable."""
-        return [
-            Document(
-                page_content="""
-                # General Diet Guidelines
-                
-                ## Indian Vegetarian High Protein Foods
-                - Paneer: 18g protein per 100g
-                - Dal (Lentils): 9g protein per 100g
-                - Chickpeas: 19g protein per 100g
-                - Greek Yogurt: 10g protein per 100g
-                - Soy chunks: 52g protein per 100g
-                
-                ## Sample Meal Plan (2000 kcal)
-                Breakfast: Paneer bhurji with 2 rotis (500 kcal)
-                Snack: Sprouts chaat (200 kcal)
-                Lunch: Rajma chawal with salad (600 kcal)
-                Snack: Protein shake with banana (250 kcal)
-                Dinner: Dal with roti and vegetables (450 kcal)
-                
-                ## Macro Split for Muscle Gain
-                - Protein: 30% (150g)
-                - Carbs: 45% (225g)
-                - Fats: 25% (55g)
-                """,
-                metadata={'type': 'diet', 'source': 'fallback', 'score': 0.5}
-            )
-        ]
+        return list(_FALLBACK_DIET_DOCS)
+
+
+# Filters and query suffixes depend only on a few profile fields, which many
+# users share; the cached filter dicts are passed to Pinecone read-only
+@lru_cache(maxsize=4096)
+def _workout_filter(experience_level: Optional[str], workout_location: Optional[str]) -> Optional[Dict]:
+    filters = {}
+    
+    if experience_level:
+        filters['experience_level'] = {"$eq": experience_level}
+    
+    if workout_location and workout_location != 'both':
+        filters['location'] = {"$eq": workout_location}
+    
+    return filters if filters else None
+
+
+@lru_cache(maxsize=4096)
+def _diet_filter(dietary_preference: Optional[str]) -> Optional[Dict]:
+    if dietary_preference:
+        return {'dietary_type': {"$eq": dietary_preference}}
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _profile_suffix(context_type: str, fitness_goal: Optional[str], experience_level: Optional[str],
+                    workout_location: Optional[str], dietary_preference: Optional[str]) -> str:
+    """Profile annotations appended to a query, e.g. "Goal: lean | Level: beginner"."""
+    enhancements = []
+    
+    if context_type == "workout":
+        if fitness_goal:
+            enhancements.append(f"Goal: {fitness_goal}")
+        if experience_level:
+            enhancements.append(f"Level: {experience_level}")
+        if workout_location:
+            enhancements.append(f"Location: {workout_location}")
+    
+    elif context_type == "diet":
+        if dietary_preference:
+            enhancements.append(f"Preference: {dietary_preference}")
+        if fitness_goal:
+            enhancements.append(f"Goal: {fitness_goal}")
+    
+    return ' | '.join(enhancements)
 
 
 # Singleton instance
 _fitness_retriever: Optional[FitnessRetriever] = None
+_fitness_retriever_lock = threading.Lock()
 
 
 def get_fitness_retriever() -> FitnessRetriever:
     """Get or create singleton fitness retriever."""
     global _fitness_retriever
     if _fitness_retriever is None:
-        _fitness_retriever = FitnessRetriever()
+        with _fitness_retriever_lock:
+            if _fitness_retriever is None:
+                _fitness_retriever = FitnessRetriever()
     return _fitness_retriever
\ No newline at end of file
@@ -1,43 +1,93 @@
 # backend/rag/vectorstore.py
 """Pinecone vector store management."""
 
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from typing import List, Dict, Optional
+from cachetools import TTLCache
 from backend.config import settings
 import time
 
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a newly created index to report ready
+INDEX_READY_TIMEOUT = 300
+
+# Chunk text stored alongside each vector, capped in characters and UTF-8 bytes
+METADATA_TEXT_MAX_CHARS = 1000
+METADATA_TEXT_MAX_BYTES = 3900
+
+
+def _metadata_text(text: str) -> str:
+    """Truncate chunk text for vector metadata without splitting a UTF-8 sequence."""
+    text = text[:METADATA_TEXT_MAX_CHARS]
+    if text.isascii():
+        return text
+    return text.encode()[:METADATA_TEXT_MAX_BYTES].decode(errors="ignore")
+
 
 class PineconeManager:
     """Manages Pinecone vector database operations."""
     
     def __init__(self):
-        """Initialize Pinecone client."""
+        """Set up the manager; the Pinecone client is created on first use."""
         self._pc = None
         self._index = None
         self._vectorstore = None
         self._initialized = False
+        # Extra Index() arguments for the client flavour in use
+        self._index_options: Dict = {}
+        # Index stats are polled by health checks; keep them briefly
+        self._stats_cache: TTLCache = TTLCache(maxsize=1, ttl=10)
+        # Importing the SDK and building the client is deferred until needed
+        self._init_attempted = False
+        self._init_lock = threading.Lock()
+    
+    def _ensure_initialized(self):
+        """Initialize the Pinecone connection once, on first access."""
+        if self._init_attempted:
+            return
         
-        if settings.PINECONE_API_KEY:
-            self._initialize()
+        with self._init_lock:
+            if not self._init_attempted:
+                if settings.PINECONE_API_KEY:
+                    self._initialize()
+                self._init_attempted = True
     
     def _initialize(self):
         """Initialize Pinecone connection."""
         try:
-            from pinecone import Pinecone
-            self._pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+            # gRPC ships vectors as packed float32 protobufs instead of JSON text
+            try:
+                from pinecone.grpc import PineconeGRPC as Pinecone
+            except ImportError:
+                from pinecone import Pinecone
+                # The REST index keeps its own urllib3 pool; size it so concurrent
+                # queries reuse kept-alive sockets instead of opening new ones
+                self._index_options = {
+                    "connection_pool_maxsize": settings.PINECONE_CONNECTION_POOL_SIZE
+                }
+            self._pc = Pinecone(
+                api_key=settings.PINECONE_API_KEY,
+                pool_threads=settings.PINECONE_POOL_THREADS
+            )
             self._initialized = True
         except Exception as e:
-            print(f"Warning: Could not initialize Pinecone: {e}")
+            logger.warning(f"Could not initialize Pinecone: {e}")
             self._initialized = False
     
     @property
     def is_available(self) -> bool:
-        """Check if Pinecone is available."""
+        """Check if Pinecone is available, connecting on first check."""
+        self._ensure_initialized()
         return self._initialized and self._pc is not None
     
     def create_index_if_not_exists(self, dimension: int = 768):
         """Create Pinecone index if it doesn't exist."""
         if not self.is_available:
-            print("Pinecone not available, skipping index creation")
+            logger.warning("Pinecone not available, skipping index creation")
             return
         
         try:
@@ -55,13 +105,20 @@ class PineconeManager:
                         region=settings.PINECONE_ENVIRONMENT
                     )
                 )
-                # Wait for index to be ready
+                # Wait for index to be ready, backing off between status checks
+                deadline = time.monotonic() + INDEX_READY_TIMEOUT
+                delay = 0.5
                 while not self._pc.describe_index(settings.PINECONE_INDEX_NAME).status['ready']:
-                    time.sleep(1)
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(
+                            f"Index {settings.PINECONE_INDEX_NAME} not ready after {INDEX_READY_TIMEOUT}s"
+                        )
+                    time.sleep(delay)
+                    delay = min(delay * 1.5, 10.0)
             
-            self._index = self._pc.Index(settings.PINECONE_INDEX_NAME)
+            self._index = self._open_index()
         except Exception as e:
-            print(f"Error creating Pinecone index: {e}")
+            logger.error(f"Error creating Pinecone index: {e}")
     
     def get_index(self):
         """Get Pinecone index."""
@@ -70,11 +127,15 @@ class PineconeManager:
         
         if self._index is None:
             try:
-                self._index = self._pc.Index(settings.PINECONE_INDEX_NAME)
+                self._index = self._open_index()
             except Exception as e:
-                print(f"Error getting Pinecone index: {e}")
+                logger.error(f"Error getting Pinecone index: {e}")
         return self._index
     
+    def _open_index(self):
+        """Open the index client that all operations on this manager share."""
+        return self._pc.Index(settings.PINECONE_INDEX_NAME, **self._index_options)
+    
     def get_vectorstore(self, namespace: str = "fitness"):
         """Get LangChain vectorstore wrapper."""
         if not self.is_available:
@@ -94,13 +155,13 @@ class PineconeManager:
                 namespace=namespace
             )
         except Exception as e:
-            print(f"Error creating vectorstore: {e}")
+            logger.error(f"Error creating vectorstore: {e}")
             return None
     
     def upsert_documents(self, documents: List[Dict], namespace: str = "fitness") -> int:
         """Upsert documents into Pinecone."""
         if not self.is_available:
-            print("Pinecone not available, skipping upsert")
+            logger.warning("Pinecone not available, skipping upsert")
             return 0
         
         try:
@@ -110,47 +171,60 @@ class PineconeManager:
             if not embedding_manager.is_available:
                 return 0
             
-            vectors = []
-            texts = [doc['text'] for doc in documents]
-            embeddings = embedding_manager.embed_documents(texts)
-            
-            for doc, embedding in zip(documents, embeddings):
-                vectors.append({
-                    'id': doc['id'],
-                    'values': embedding,
-                    'metadata': {
-                        **doc.get('metadata', {}),
-                        'text': doc['text'][:1000]
-                    }
-                })
-            
-            # Batch upsert
             index = self.get_index()
-            if index:
-                batch_size = 100
-                for i in range(0, len(vectors), batch_size):
-                    batch = vectors[i:i + batch_size]
-                    index.upsert(vectors=batch, namespace=namespace)
+            if not index:
+                return 0
             
-            return len(vectors)
+            # Each batch is embedded and upserted on its own, so only the batches
+            # in flight hold embeddings and later embeds overlap earlier upserts
+            batch_size = 100
+            batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+            if len(batches) <= 1:
+                for batch in batches:
+                    self._embed_and_upsert(index, embedding_manager, batch, namespace)
+            else:
+                workers = min(settings.INGESTION_WORKERS, len(batches))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    list(pool.map(
+                        self._embed_and_upsert,
+                        repeat(index), repeat(embedding_manager), batches, repeat(namespace)
+                    ))
+            
+            return len(documents)
         except Exception as e:
-            print(f"Error upserting documents: {e}")
+            logger.error(f"Error upserting documents: {e}")
             return 0
     
+    @staticmethod
+    def _embed_and_upsert(index, embedding_manager, documents: List[Dict], namespace: str) -> None:
+        """Embed one batch of documents and upsert the resulting vectors."""
+        embeddings = embedding_manager.embed_documents([doc['text'] for doc in documents])
+        vectors = [
+            {
+                'id': doc['id'],
+                'values': embedding,
+                'metadata': {**doc.get('metadata', {}), 'text': _metadata_text(doc['text'])}
+            }
+            for doc, embedding in zip(documents, embeddings)
+        ]
+        index.upsert(vectors=vectors, namespace=namespace)
+    
     def query(self, query: str, top_k: int = 5, namespace: str = "fitness",
-              filter_dict: Optional[Dict] = None) -> List[Dict]:
-        """Query the vector store."""
+              filter_dict: Optional[Dict] = None,
+              query_embedding: Optional[List[float]] = None) -> List[Dict]:
+        """Query the vector store, embedding `query` unless `query_embedding` is given."""
         if not self.is_available:
             return []
         
         try:
-            from backend.rag.embeddings import get_embedding_manager
-            
-            embedding_manager = get_embedding_manager()
-            if not embedding_manager.is_available:
-                return []
-            
-            query_embedding = embedding_manager.embed_query(query)
+            if query_embedding is None:
+                from backend.rag.embeddings import get_embedding_manager
+                
+                embedding_manager = get_embedding_manager()
+                if not embedding_manager.is_available:
+                    return []
+                
+                query_embedding = embedding_manager.embed_query(query)
             index = self.get_index()
             
             if not index:
@@ -174,7 +248,7 @@ class PineconeManager:
                 for match in results.get('matches', [])
             ]
         except Exception as e:
-            print(f"Error querying Pinecone: {e}")
+            logger.error(f"Error querying Pinecone: {e}")
             return []
     
     def delete_namespace(self, namespace: str):
@@ -187,17 +261,23 @@ class PineconeManager:
             if index:
                 index.delete(delete_all=True, namespace=namespace)
         except Exception as e:
-            print(f"Error deleting namespace: {e}")
+            logger.error(f"Error deleting namespace: {e}")
     
     def get_stats(self) -> Dict:
         """Get index statistics."""
         if not self.is_available:
             return {"status": "unavailable"}
         
+        stats = self._stats_cache.get("stats")
+        if stats is not None:
+            return stats
+        
         try:
             index = self.get_index()
             if index:
-                return index.describe_index_stats()
+                stats = index.describe_index_stats()
+                self._stats_cache["stats"] = stats
+                return stats
             return {"status": "no index"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -205,11 +285,14 @@ class PineconeManager:
 
 # Singleton instance
 _pinecone_manager: Optional[PineconeManager] = None
+_pinecone_manager_lock = threading.Lock()
 
 
 def get_pinecone_manager() -> PineconeManager:
     """Get or create singleton Pinecone manager."""
     global _pinecone_manager
     if _pinecone_manager is None:
-        _pinecone_manager = PineconeManager()
+        with _pinecone_manager_lock:
+            if _pinecone_manager is None:
+                _pinecone_manager = PineconeManager()
     return _pinecone_manager
\ No newline at end of file
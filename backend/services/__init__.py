@@ -2,16 +2,16 @@
 """Services package initialization - Lazy imports."""
 
 def get_user_service():
-    from backend.services.user_service import UserService
-    return UserService()
+    from backend.services.user_service import get_user_service as _get
+    return _get()
 
 def get_plan_service():
-    from backend.services.plan_service import PlanService
-    return PlanService()
+    from backend.services.plan_service import get_plan_service as _get
+    return _get()
 
 def get_progress_service():
-    from backend.services.progress_service import ProgressService
-    return ProgressService()
+    from backend.services.progress_service import get_progress_service as _get
+    return _get()
 
 def get_calorie_calculator():
     from backend.services.calorie_service import CalorieCalculator
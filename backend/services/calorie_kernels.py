@@ -0,0 +1,40 @@
+# backend/services/calorie_kernels.py
+"""Numba kernel for batch calorie and macro calculation."""
+
+import numpy as np
+from numba import njit, prange
+
+from backend.services.calorie_service import CalorieCalculator
+
+# Lookup tables are frozen into the compiled kernel as constants
+ACTIVITY_MULTIPLIERS = CalorieCalculator._ACTIVITY_MULTIPLIER_TABLE
+GOAL_ADJUSTMENTS = CalorieCalculator._GOAL_ADJUSTMENT_TABLE
+MACRO_RATIOS = CalorieCalculator._MACRO_RATIO_TABLE
+
+
+@njit(parallel=True, cache=True)
+def compute_all(weight, height, age, is_male, activity_code, goal_code,
+                out_bmi, out_bmr, out_tdee, out_cal, out_p, out_c, out_f):
+    """
+    Fill BMI, BMR, TDEE, calorie and macro arrays in one pass.
+    
+    Mirrors the NumPy path of CalorieCalculator.calculate_all_batch without
+    materializing intermediate arrays. Codes index the CalorieCalculator
+    tables, including their trailing unknown-value row.
+    """
+    for i in prange(weight.shape[0]):
+        out_bmi[i] = weight[i] / (height[i] / 100) ** 2
+        
+        bmr = 10 * weight[i] + 6.25 * height[i] - 5 * age[i] + (5.0 if is_male[i] else -161.0)
+        bmr = np.rint(bmr)
+        tdee = np.rint(bmr * ACTIVITY_MULTIPLIERS[activity_code[i]])
+        calories = max(np.trunc(tdee + GOAL_ADJUSTMENTS[goal_code[i]]), 1200.0)
+        out_bmr[i] = bmr
+        out_tdee[i] = tdee
+        out_cal[i] = calories
+        
+        # Protein & carbs = 4 cal/g, fats = 9 cal/g
+        goal = goal_code[i]
+        out_p[i] = np.trunc(calories * MACRO_RATIOS[goal, 0] / 4)
+        out_c[i] = np.trunc(calories * MACRO_RATIOS[goal, 1] / 4)
+        out_f[i] = np.trunc(calories * MACRO_RATIOS[goal, 2] / 9)
@@ -1,7 +1,9 @@
 # backend/services/calorie_service.py
 """Calorie and macro calculation service."""
 
-from typing import Dict
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+from functools import lru_cache
+import numpy as np
 from backend.models.user import ActivityLevel, FitnessGoal
 
 
@@ -31,6 +33,30 @@ class CalorieCalculator:
         FitnessGoal.FAT_LOSS: {"protein": 0.35, "carbs": 0.30, "fats": 0.35}
     }
     
+    # The tables above keyed by the raw strings stored on users, so the scalar
+    # path resolves a value with one dict lookup instead of an Enum round-trip
+    _ACTIVITY_BY_STR = {level.value: multiplier for level, multiplier in ACTIVITY_MULTIPLIERS.items()}
+    _GOAL_BY_STR = {goal.value: adjustment for goal, adjustment in GOAL_ADJUSTMENTS.items()}
+    # Flat (protein, carbs, fats) ratio tuples; the lean split covers unknown goals
+    _MACRO_BY_STR = {
+        goal.value: (ratios["protein"], ratios["carbs"], ratios["fats"])
+        for goal, ratios in MACRO_RATIOS.items()
+    }
+    _DEFAULT_MACRO_RATIOS = _MACRO_BY_STR[FitnessGoal.LEAN.value]
+    
+    # Array forms of the tables above for calculate_all_batch. Rows follow the
+    # dict order; the extra last row holds the scalar path's unknown-value default.
+    _ACTIVITY_CODES = {level.value: code for code, level in enumerate(ACTIVITY_MULTIPLIERS)}
+    _GOAL_CODES = {goal.value: code for code, goal in enumerate(GOAL_ADJUSTMENTS)}
+    _ACTIVITY_MULTIPLIER_TABLE = np.array([*ACTIVITY_MULTIPLIERS.values(), 1.55])
+    _GOAL_ADJUSTMENT_TABLE = np.array([*GOAL_ADJUSTMENTS.values(), 0])
+    _MACRO_RATIO_TABLE = np.array(
+        [list(ratios.values()) for ratios in [*MACRO_RATIOS.values(), MACRO_RATIOS[FitnessGoal.LEAN]]]
+    )
+    
+    # Batches at least this large use the fused Numba kernel when available
+    KERNEL_MIN_ROWS = 50_000
+    
     def calculate_bmi(self, weight_kg: float, height_cm: float) -> float:
         """Calculate Body Mass Index."""
         height_m = height_cm / 100
@@ -63,40 +89,26 @@ class CalorieCalculator:
     
     def calculate_tdee(self, bmr: float, activity_level: str) -> float:
         """Calculate Total Daily Energy Expenditure."""
-        try:
-            activity = ActivityLevel(activity_level)
-            multiplier = self.ACTIVITY_MULTIPLIERS.get(activity, 1.55)
-        except ValueError:
-            multiplier = 1.55  # Default to moderately active
-        
+        multiplier = self._ACTIVITY_BY_STR.get(activity_level, 1.55)  # Default to moderately active
         return round(bmr * multiplier, 0)
     
     def calculate_daily_calories(self, tdee: float, fitness_goal: str) -> int:
         """Calculate daily calorie target based on goal."""
-        try:
-            goal = FitnessGoal(fitness_goal)
-            adjustment = self.GOAL_ADJUSTMENTS.get(goal, 0)
-        except ValueError:
-            adjustment = 0
-        
-        calories = tdee + adjustment
+        calories = tdee + self._GOAL_BY_STR.get(fitness_goal, 0)
         
         # Ensure minimum safe calories
         min_calories = 1200  # General minimum
         return max(int(calories), min_calories)
     
-    def calculate_macros(self, daily_calories: int, fitness_goal: str) -> Dict[str, int]:
-        """Calculate macro nutrient targets in grams."""
-        try:
-            goal = FitnessGoal(fitness_goal)
-            ratios = self.MACRO_RATIOS.get(goal, self.MACRO_RATIOS[FitnessGoal.LEAN])
-        except ValueError:
-            ratios = self.MACRO_RATIOS[FitnessGoal.LEAN]
+    def calculate_macros(self, daily_calories: int, fitness_goal: str,
+                         ratios: Optional[Tuple[float, float, float]] = None) -> Dict[str, int]:
+        """Calculate macro nutrient targets in grams, optionally from already resolved ratios."""
+        protein, carbs, fats = ratios or self._MACRO_BY_STR.get(fitness_goal, self._DEFAULT_MACRO_RATIOS)
         
         # Calculate grams (protein & carbs = 4 cal/g, fats = 9 cal/g)
-        protein_cals = daily_calories * ratios["protein"]
-        carbs_cals = daily_calories * ratios["carbs"]
-        fats_cals = daily_calories * ratios["fats"]
+        protein_cals = daily_calories * protein
+        carbs_cals = daily_calories * carbs
+        fats_cals = daily_calories * fats
         
         return {
             "protein_g": int(protein_cals / 4),
@@ -120,6 +132,7 @@ class CalorieCalculator:
         gender = user_profile.get("gender")
         activity = user_profile.get("activity_level")
         goal = user_profile.get("fitness_goal")
+        ratios = self._MACRO_BY_STR.get(goal, self._DEFAULT_MACRO_RATIOS)
         
         # Calculate metrics
         bmi = self.calculate_bmi(weight, height)
@@ -127,7 +140,7 @@ class CalorieCalculator:
         bmr = self.calculate_bmr(weight, height, age, gender)
         tdee = self.calculate_tdee(bmr, activity)
         daily_calories = self.calculate_daily_calories(tdee, goal)
-        macros = self.calculate_macros(daily_calories, goal)
+        macros = self.calculate_macros(daily_calories, goal, ratios)
         
         # Calculate ideal weight range (BMI 18.5-24.9)
         height_m = height / 100
@@ -150,8 +163,91 @@ class CalorieCalculator:
             "ideal_weight_max": ideal_weight_max,
             "water_ml": water_ml,
             "macro_percentages": {
-                "protein": int(self.MACRO_RATIOS.get(FitnessGoal(goal), {}).get("protein", 0.3) * 100),
-                "carbs": int(self.MACRO_RATIOS.get(FitnessGoal(goal), {}).get("carbs", 0.4) * 100),
-                "fats": int(self.MACRO_RATIOS.get(FitnessGoal(goal), {}).get("fats", 0.3) * 100)
+                "protein": int(ratios[0] * 100),
+                "carbs": int(ratios[1] * 100),
+                "fats": int(ratios[2] * 100)
+            }
+        }
+    
+    def calculate_all_batch(self, profiles: Mapping[str, Sequence]) -> Dict:
+        """
+        Vectorized calculate_all for many profiles at once.
+        
+        Args:
+            profiles: Column-oriented profile data (a dict of sequences or a
+                pandas DataFrame) with weight_kg, height_cm, age, gender,
+                activity_level and fitness_goal columns
+            
+        Returns:
+            Dictionary with the same keys as calculate_all, each holding one
+            NumPy array entry per profile. One-decimal values can differ
+            from calculate_all in the last digit on exact rounding ties.
+        """
+        weight = np.asarray(profiles["weight_kg"], dtype=np.float64)
+        height = np.asarray(profiles["height_cm"], dtype=np.float64)
+        age = np.asarray(profiles["age"], dtype=np.float64)
+        is_male = np.char.lower(np.asarray(profiles["gender"], dtype=str)) == "male"
+        activity = self._encode(profiles["activity_level"], self._ACTIVITY_CODES)
+        goal = self._encode(profiles["fitness_goal"], self._GOAL_CODES)
+        
+        height_m_sq = (height / 100) ** 2
+        kernel = _load_compute_kernel() if len(weight) >= self.KERNEL_MIN_ROWS else None
+        if kernel is not None:
+            bmi, bmr, tdee = np.empty_like(weight), np.empty_like(weight), np.empty_like(weight)
+            daily_calories = np.empty(len(weight), dtype=np.int64)
+            macros = np.empty((len(weight), 3), dtype=np.int64)
+            kernel(
+                weight, height, age, is_male, activity, goal,
+                bmi, bmr, tdee, daily_calories, macros[:, 0], macros[:, 1], macros[:, 2]
+            )
+        else:
+            bmi = weight / height_m_sq
+            bmr = np.round(10 * weight + 6.25 * height - 5 * age + np.where(is_male, 5, -161))
+            tdee = np.round(bmr * self._ACTIVITY_MULTIPLIER_TABLE[activity])
+            daily_calories = np.maximum(
+                np.trunc(tdee + self._GOAL_ADJUSTMENT_TABLE[goal]), 1200
+            ).astype(np.int64)
+            
+            # Protein & carbs = 4 cal/g, fats = 9 cal/g
+            macros = np.trunc(
+                daily_calories[:, None] * self._MACRO_RATIO_TABLE[goal] / np.array([4, 4, 9])
+            ).astype(np.int64)
+        percentages = np.trunc(self._MACRO_RATIO_TABLE[goal] * 100).astype(np.int64)
+        
+        return {
+            "bmi": np.round(bmi, 1),
+            "bmi_category": np.select(
+                [bmi < 18.5, bmi < 25, bmi < 30],
+                ["Underweight", "Normal", "Overweight"],
+                default="Obese"
+            ),
+            "bmr": bmr.astype(np.int64),
+            "tdee": tdee.astype(np.int64),
+            "daily_calories": daily_calories,
+            "protein_g": macros[:, 0],
+            "carbs_g": macros[:, 1],
+            "fats_g": macros[:, 2],
+            "ideal_weight_min": np.round(18.5 * height_m_sq, 1),
+            "ideal_weight_max": np.round(24.9 * height_m_sq, 1),
+            "water_ml": np.trunc(weight * 35).astype(np.int64),
+            "macro_percentages": {
+                "protein": percentages[:, 0],
+                "carbs": percentages[:, 1],
+                "fats": percentages[:, 2]
             }
-        }
\ No newline at end of file
+        }
+    
+    def _encode(self, values: Sequence, codes: Dict[str, int]) -> np.ndarray:
+        """Map category strings to table rows, looking up each distinct value once."""
+        distinct, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        return np.array([codes.get(value, len(codes)) for value in distinct])[inverse.reshape(-1)]
+
+
+@lru_cache(maxsize=1)
+def _load_compute_kernel():
+    """Import the Numba batch kernel on first use; None when Numba is not installed."""
+    try:
+        from backend.services.calorie_kernels import compute_all
+    except ImportError:
+        return None
+    return compute_all
@@ -1,27 +1,40 @@
 # backend/services/plan_service.py
 """Plan generation service."""
 
-from typing import Dict, Optional
-from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from functools import cached_property, lru_cache
+import orjson
+from cachetools import TTLCache
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool
 
 from backend.database.crud import PlanCRUD, UserCRUD
 from backend.database.models import User
-from backend.rag.chain import get_rag_chain
-from backend.services.progress_service import ProgressService
+from backend.rag.chain import FitnessRAGChain, get_rag_chain
+from backend.services.progress_service import get_progress_service
 from backend.services.calorie_service import CalorieCalculator
 
+# Active plans keyed by user ID and stored with the user's plan_version; entries
+# are only served while that version is current, so saves made in other worker
+# processes are picked up on the next read
+_active_plans_cache: TTLCache = TTLCache(maxsize=10000, ttl=60)
+
 
 class PlanService:
     """Service for generating and managing fitness/diet plans."""
     
     def __init__(self):
-        self.rag_chain = get_rag_chain()
-        self.progress_service = ProgressService()
+        self.progress_service = get_progress_service()
         self.calorie_calculator = CalorieCalculator()
     
-    def generate_plan(
+    @cached_property
+    def rag_chain(self) -> FitnessRAGChain:
+        """RAG chain, built on first plan generation rather than at route import."""
+        return get_rag_chain()
+    
+    async def generate_plan(
         self,
-        db: Session,
+        db: AsyncSession,
         user_id: str,
         plan_type: str = "both",
         custom_query: Optional[str] = None
@@ -38,60 +51,144 @@ class PlanService:
         Returns:
             Generated plan with sources
         """
-        # Get user profile
-        user = UserCRUD.get_by_id(db, user_id)
-        if not user:
-            raise ValueError("User not found")
+        # Get user profile and progress context
+        user_profile, progress_data = await self._load_user_context(db, user_id)
+        return await self._generate_for_context(
+            db, user_id, user_profile, progress_data, plan_type, custom_query
+        )
+    
+    async def _generate_for_context(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        user_profile: Dict,
+        progress_data: Dict,
+        plan_type: str,
+        custom_query: Optional[str]
+    ) -> Dict:
+        """Generate and save a plan for an already loaded profile and progress context."""
+        # Generate default query if not provided
+        if not custom_query:
+            custom_query = self._generate_default_query(user_profile, plan_type)
+        
+        # Generate plan using RAG; a plan saved as the new active one is always
+        # freshly generated rather than replayed from the response cache
+        result = await self.rag_chain.agenerate_plan(
+            user_profile=user_profile,
+            user_query=custom_query,
+            plan_type=plan_type,
+            progress_data=progress_data,
+            use_cache=False
+        )
         
-        # Convert to profile dict
-        user_profile = self._user_to_profile_dict(user)
+        # Save plans to database
+        await self._save_generated_plans(
+            db, user_id, user_profile, plan_type, result["response"], result["sources"]
+        )
+        return result
+    
+    async def stream_plan(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        plan_type: str = "both",
+        custom_query: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Start streaming a personalized plan as server-sent events.
         
-        # Get progress context
-        progress_data = self.progress_service.get_progress_context_for_rag(db, user_id)
+        The user is loaded before returning, so a missing user raises ValueError
+        ahead of the response. The returned generator saves the plans once the
+        full response has been streamed.
+        """
+        user_profile, progress_data = await self._load_user_context(db, user_id)
         
-        # Generate default query if not provided
         if not custom_query:
             custom_query = self._generate_default_query(user_profile, plan_type)
         
-        # Generate plan using RAG
-        result = self.rag_chain.generate_plan(
+        events = self.rag_chain.generate_plan_stream(
             user_profile=user_profile,
             user_query=custom_query,
             plan_type=plan_type,
-            progress_data=progress_data
+            progress_data=progress_data,
+            use_cache=False
         )
+        return self._stream_and_save(db, user_id, user_profile, plan_type, events)
+    
+    async def _stream_and_save(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        user_profile: Dict,
+        plan_type: str,
+        events: Iterator[Tuple[str, Any]]
+    ) -> AsyncIterator[str]:
+        """Relay chain events as SSE messages, then save the completed plan."""
+        sources = []
+        chunks = []
+        completed = True
         
-        # Save plans to database
+        # The chain streams synchronously; pull each event off the event loop
+        async for event, data in iterate_in_threadpool(events):
+            if event == "metadata":
+                sources = data["sources"]
+            elif event == "token":
+                chunks.append(data)
+            else:
+                completed = False
+            yield self._format_event(event, data)
+        
+        if completed:
+            await self._save_generated_plans(
+                db, user_id, user_profile, plan_type, "".join(chunks), sources
+            )
+        yield self._format_event("done", {"saved": completed})
+    
+    async def _save_generated_plans(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        user_profile: Dict,
+        plan_type: str,
+        response: str,
+        sources: List[Dict]
+    ) -> None:
+        """Save a generated combined response as the user's active plan(s) in one transaction."""
+        workout_plan_data = diet_plan_data = None
         if plan_type in ["workout", "both"]:
             workout_plan_data = {
                 "plan_name": f"{user_profile['fitness_goal'].title()} Workout Plan",
                 "description": "AI-generated personalized workout plan",
-                "plan_content": result["response"],
-                "sources": result["sources"]
+                "plan_content": response,
+                "sources": sources
             }
-            PlanCRUD.save_workout_plan(db, user_id, workout_plan_data)
         
         if plan_type in ["diet", "both"]:
             diet_plan_data = {
                 "plan_name": f"{user_profile['dietary_preference'].title()} Diet Plan",
                 "description": "AI-generated personalized diet plan",
-                "plan_content": result["response"],
-                "sources": result["sources"]
+                "plan_content": response,
+                "sources": sources
             }
-            PlanCRUD.save_diet_plan(db, user_id, diet_plan_data)
         
-        return result
+        await PlanCRUD.save_plans_bulk(
+            db, user_id, workout_data=workout_plan_data, diet_data=diet_plan_data
+        )
+        _active_plans_cache.pop(user_id, None)
     
-    def generate_workout_plan(self, db: Session, user_id: str) -> Dict:
-        """Generate only a workout plan."""
-        user = UserCRUD.get_by_id(db, user_id)
-        if not user:
-            raise ValueError("User not found")
-        
-        user_profile = self._user_to_profile_dict(user)
-        progress_data = self.progress_service.get_progress_context_for_rag(db, user_id)
+    @staticmethod
+    def _format_event(event: str, data: Any) -> str:
+        """Encode one server-sent event with a JSON payload."""
+        return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+    
+    async def generate_workout_plan(self, db: AsyncSession, user_id: str,
+                                    regenerate: bool = False) -> Dict:
+        """Generate only a workout plan; regenerate skips any cached generation."""
+        user_profile, progress_data = await self._load_user_context(db, user_id)
         
-        result = self.rag_chain.generate_workout_plan(user_profile, progress_data)
+        result = await self.rag_chain.agenerate_workout_plan(
+            user_profile, progress_data, use_cache=not regenerate
+        )
         
         # Save plan
         plan_data = {
@@ -100,7 +197,8 @@ class PlanService:
             "plan_content": result["plan"],
             "sources": result["sources"]
         }
-        saved_plan = PlanCRUD.save_workout_plan(db, user_id, plan_data)
+        saved_plan = await PlanCRUD.save_workout_plan(db, user_id, plan_data)
+        _active_plans_cache.pop(user_id, None)
         
         return {
             "plan_id": saved_plan.id,
@@ -108,16 +206,14 @@ class PlanService:
             "sources": result["sources"]
         }
     
-    def generate_diet_plan(self, db: Session, user_id: str) -> Dict:
-        """Generate only a diet plan."""
-        user = UserCRUD.get_by_id(db, user_id)
-        if not user:
-            raise ValueError("User not found")
-        
-        user_profile = self._user_to_profile_dict(user)
-        progress_data = self.progress_service.get_progress_context_for_rag(db, user_id)
+    async def generate_diet_plan(self, db: AsyncSession, user_id: str,
+                                 regenerate: bool = False) -> Dict:
+        """Generate only a diet plan; regenerate skips any cached generation."""
+        user_profile, progress_data = await self._load_user_context(db, user_id)
         
-        result = self.rag_chain.generate_diet_plan(user_profile, progress_data)
+        result = await self.rag_chain.agenerate_diet_plan(
+            user_profile, progress_data, use_cache=not regenerate
+        )
         
         # Save plan
         plan_data = {
@@ -127,7 +223,8 @@ class PlanService:
             "stats": result["stats"],
             "sources": result["sources"]
         }
-        saved_plan = PlanCRUD.save_diet_plan(db, user_id, plan_data)
+        saved_plan = await PlanCRUD.save_diet_plan(db, user_id, plan_data)
+        _active_plans_cache.pop(user_id, None)
         
         return {
             "plan_id": saved_plan.id,
@@ -136,34 +233,54 @@ class PlanService:
             "sources": result["sources"]
         }
     
-    def get_active_plans(self, db: Session, user_id: str) -> Dict:
+    async def get_active_plans(self, db: AsyncSession, user_id: str) -> Dict:
         """Get user's active workout and diet plans."""
-        workout_plan = PlanCRUD.get_active_workout_plan(db, user_id)
-        diet_plan = PlanCRUD.get_active_diet_plan(db, user_id)
+        plans, _ = await self.get_active_plans_with_etag(db, user_id)
+        return plans
+    
+    async def get_active_plans_with_etag(self, db: AsyncSession, user_id: str) -> Tuple[Dict, str]:
+        """Get user's active plans plus an ETag that changes whenever either plan is replaced."""
+        # Read the version before the plans: a save in between leaves an older
+        # version cached with the newer plans, which the next read replaces
+        version = await PlanCRUD.get_plan_version(db, user_id) or 0
+        cached = _active_plans_cache.get(user_id)
+        if cached is None or cached[0] != version:
+            workout_plan = await PlanCRUD.get_active_workout_plan(db, user_id)
+            diet_plan = await PlanCRUD.get_active_diet_plan(db, user_id)
+            
+            plans = {
+                "workout_plan": workout_plan.plan_data if workout_plan else None,
+                "diet_plan": diet_plan.plan_data if diet_plan else None
+            }
+            cached = _active_plans_cache[user_id] = (version, plans)
         
-        return {
-            "workout_plan": workout_plan.plan_data if workout_plan else None,
-            "diet_plan": diet_plan.plan_data if diet_plan else None
-        }
+        version, plans = cached
+        return dict(plans), f'"{version}"'
     
-    def regenerate_plan_with_progress(
+    async def regenerate_plan_with_progress(
         self,
-        db: Session,
+        db: AsyncSession,
         user_id: str,
         plan_type: str
     ) -> Dict:
         """Regenerate plan considering progress data."""
-        user = UserCRUD.get_by_id(db, user_id)
-        if not user:
-            raise ValueError("User not found")
-        
-        user_profile = self._user_to_profile_dict(user)
-        progress_data = self.progress_service.get_progress_context_for_rag(db, user_id)
+        user_profile, progress_data = await self._load_user_context(db, user_id)
         
         # Build progress-aware query
         query = self._build_progress_aware_query(progress_data, plan_type)
         
-        return self.generate_plan(db, user_id, plan_type, query)
+        # Reuse the loaded context rather than fetching the user again
+        return await self._generate_for_context(
+            db, user_id, user_profile, progress_data, plan_type, query
+        )
+    
+    async def _load_user_context(self, db: AsyncSession, user_id: str) -> Tuple[Dict, Dict]:
+        """Load the profile and progress context with one user query plus batched log loads."""
+        user = await UserCRUD.get_with_progress_window(db, user_id, days=30)
+        if not user:
+            raise ValueError("User not found")
+        
+        return self._user_to_profile_dict(user), self.progress_service.build_progress_context(user)
     
     def _user_to_profile_dict(self, user: User) -> Dict:
         """Convert User model to profile dictionary."""
@@ -217,4 +334,10 @@ class PlanService:
             return f"Based on my progress: {'; '.join(base_query)}. Please generate an updated {plan_type} plan."
         else:
             return f"Generate an updated {plan_type} plan based on my current progress."
-        
\ No newline at end of file
+        
+
+
+@lru_cache(maxsize=1)
+def get_plan_service() -> PlanService:
+    """Get cached plan service instance."""
+    return PlanService()
\ No newline at end of file
@@ -1,22 +1,43 @@
 # backend/services/progress_service.py
 """Progress tracking service."""
 
-from typing import List, Dict, Optional
-from datetime import date, datetime, timedelta
-from sqlalchemy.orm import Session
+import base64
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+from functools import lru_cache
+from datetime import date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.database.crud import ProgressCRUD
 from backend.database.models import User
-from backend.models.progress import ProgressSummary, ProgressChartData
+from backend.models.progress import (
+    MeasurementLog, WorkoutLog, CalorieLog,
+    ProgressSummary, ProgressChartData
+)
+from backend.models.responses import ListResponse
+
+
+def _encode_cursor(log_date: date, log_id: str) -> str:
+    """Encode a (date, id) keyset position as an opaque URL-safe cursor."""
+    return base64.urlsafe_b64encode(f"{log_date.isoformat()},{log_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[date, str]:
+    """Decode a cursor produced by _encode_cursor; raises ValueError if malformed."""
+    try:
+        log_date, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(",", 1)
+        return date.fromisoformat(log_date), log_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
 
 
 class ProgressService:
     """Service for progress tracking operations."""
     
-    def log_weight(self, db: Session, user_id: str, weight_kg: float,
-                   log_date: date, notes: Optional[str] = None) -> Dict:
+    async def log_weight(self, db: AsyncSession, user_id: str, weight_kg: float,
+                         log_date: date, notes: Optional[str] = None) -> Dict:
         """Log a weight entry."""
-        log = ProgressCRUD.log_weight(db, user_id, weight_kg, log_date, notes)
+        log = await ProgressCRUD.log_weight(db, user_id, weight_kg, log_date, notes)
         return {
             "id": log.id,
             "weight_kg": log.weight_kg,
@@ -24,10 +45,34 @@ class ProgressService:
             "notes": log.notes
         }
     
-    def log_measurements(self, db: Session, user_id: str, 
-                        measurements: Dict) -> Dict:
+    async def get_weight_history_page(self, db: AsyncSession, user_id: str,
+                                      cursor: Optional[str] = None,
+                                      limit: int = 100) -> ListResponse:
+        """Get a keyset-paginated page of weight history, newest first."""
+        before = _decode_cursor(cursor) if cursor else None
+        logs = await ProgressCRUD.get_weight_page(db, user_id, before, limit)
+        
+        return ListResponse(
+            data=[
+                {
+                    "id": log.id,
+                    "weight_kg": log.weight_kg,
+                    "date": log.date.isoformat(),
+                    "notes": log.notes
+                }
+                for log in logs
+            ],
+            total=len(logs),
+            page_size=limit,
+            next_cursor=_encode_cursor(logs[-1].date, logs[-1].id) if len(logs) == limit else None
+        )
+    
+    async def log_measurements(self, db: AsyncSession, user_id: str, 
+                               measurements: MeasurementLog) -> Dict:
         """Log body measurements."""
-        log = ProgressCRUD.log_measurements(db, user_id, measurements)
+        log = await ProgressCRUD.log_measurements(
+            db, user_id, measurements.model_dump(mode="python", exclude_unset=True)
+        )
         return {
             "id": log.id,
             "date": log.date.isoformat(),
@@ -41,10 +86,12 @@ class ProgressService:
             }
         }
     
-    def log_workout(self, db: Session, user_id: str, 
-                   workout_data: Dict) -> Dict:
+    async def log_workout(self, db: AsyncSession, user_id: str, 
+                          workout_data: WorkoutLog) -> Dict:
         """Log workout completion."""
-        log = ProgressCRUD.log_workout(db, user_id, workout_data)
+        log = await ProgressCRUD.log_workout(
+            db, user_id, workout_data.model_dump(mode="python", exclude_unset=True)
+        )
         return {
             "id": log.id,
             "date": log.date.isoformat(),
@@ -52,10 +99,12 @@ class ProgressService:
             "duration_mins": log.duration_mins
         }
     
-    def log_calories(self, db: Session, user_id: str,
-                    calorie_data: Dict) -> Dict:
+    async def log_calories(self, db: AsyncSession, user_id: str,
+                           calorie_data: CalorieLog) -> Dict:
         """Log daily calorie intake."""
-        log = ProgressCRUD.log_calories(db, user_id, calorie_data)
+        log = await ProgressCRUD.log_calories(
+            db, user_id, calorie_data.model_dump(mode="python", exclude_unset=True)
+        )
         return {
             "id": log.id,
             "date": log.date.isoformat(),
@@ -67,22 +116,46 @@ class ProgressService:
             }
         }
     
-    def get_progress_summary(self, db: Session, user_id: str, 
-                            days: int = 30) -> ProgressSummary:
+    async def get_progress_summary(self, db: AsyncSession, user_id: str, 
+                                   days: int = 30) -> ProgressSummary:
         """Get a summary of user's progress."""
-        # Get weight history
-        weight_logs = ProgressCRUD.get_weight_history(db, user_id, days)
-        
-        # Get workout history
-        workout_logs = ProgressCRUD.get_workout_history(db, user_id, days)
-        
-        # Get calorie history
-        calorie_logs = ProgressCRUD.get_calorie_history(db, user_id, days)
+        stats = await ProgressCRUD.summarize(db, user_id, days)
         
+        return self._summary_from_stats(
+            user_id, days,
+            starting_weight=stats.starting_weight or 0,
+            current_weight=stats.current_weight or 0,
+            weight_count=stats.weight_count,
+            total_planned=stats.workouts_total,
+            total_completed=stats.workouts_completed,
+            avg_calories=float(stats.avg_calories or 0),
+            calorie_count=stats.calorie_count
+        )
+    
+    def _build_summary(self, user_id: str, days: int, weight_logs: List,
+                       workout_logs: List, calorie_logs: List) -> ProgressSummary:
+        """Build a progress summary from date-descending log lists."""
+        return self._summary_from_stats(
+            user_id, days,
+            starting_weight=weight_logs[-1].weight_kg if weight_logs else 0,
+            current_weight=weight_logs[0].weight_kg if weight_logs else 0,
+            weight_count=len(weight_logs),
+            total_planned=len(workout_logs),
+            total_completed=sum(1 for log in workout_logs if log.completed),
+            avg_calories=(
+                sum(log.total_calories for log in calorie_logs) / len(calorie_logs)
+                if calorie_logs else 0
+            ),
+            calorie_count=len(calorie_logs)
+        )
+    
+    def _summary_from_stats(self, user_id: str, days: int, starting_weight: float,
+                            current_weight: float, weight_count: int,
+                            total_planned: int, total_completed: int,
+                            avg_calories: float, calorie_count: int) -> ProgressSummary:
+        """Build a progress summary from aggregated log statistics."""
         # Calculate weight metrics
-        if weight_logs and len(weight_logs) >= 2:
-            starting_weight = weight_logs[-1].weight_kg
-            current_weight = weight_logs[0].weight_kg
+        if weight_count >= 2:
             weight_change = current_weight - starting_weight
             
             if weight_change < -0.5:
@@ -92,22 +165,18 @@ class ProgressService:
             else:
                 weight_trend = "maintaining"
         else:
-            starting_weight = current_weight = weight_logs[0].weight_kg if weight_logs else 0
+            starting_weight = current_weight
             weight_change = 0
             weight_trend = "insufficient_data"
         
         # Calculate workout completion
-        total_planned = len(workout_logs) if workout_logs else 0
-        total_completed = sum(1 for log in workout_logs if log.completed) if workout_logs else 0
         completion_rate = (total_completed / total_planned * 100) if total_planned > 0 else 0
         
         # Calculate calorie adherence
-        if calorie_logs:
+        if calorie_count:
             # This would need user's target calories to calculate properly
-            avg_calories = sum(log.total_calories for log in calorie_logs) / len(calorie_logs)
             adherence_rate = 85.0  # Placeholder - would calculate based on target
         else:
-            avg_calories = 0
             adherence_rate = 0
         
         # Generate insights
@@ -138,18 +207,22 @@ class ProgressService:
             adjustments_needed=adjustments
         )
     
-    def get_chart_data(self, db: Session, user_id: str, 
-                       days: int = 30) -> ProgressChartData:
-        """Get data formatted for charts."""
+    async def get_chart_data(self, db: AsyncSession, user_id: str, 
+                             days: int = 30) -> ProgressChartData:
+        """Get data formatted for charts, loading only the columns each chart reads."""
         # Weight data
-        weight_logs = ProgressCRUD.get_weight_history(db, user_id, days)
+        weight_logs = await ProgressCRUD.get_weight_history(
+            db, user_id, days, columns=("date", "weight_kg")
+        )
         weight_data = [
             {"date": log.date.strftime("%Y-%m-%d"), "weight": log.weight_kg}
             for log in reversed(weight_logs)
         ]
         
         # Calorie data
-        calorie_logs = ProgressCRUD.get_calorie_history(db, user_id, days)
+        calorie_logs = await ProgressCRUD.get_calorie_history(
+            db, user_id, days, columns=("date", "total_calories")
+        )
         calorie_data = [
             {
                 "date": log.date.strftime("%Y-%m-%d"),
@@ -160,11 +233,15 @@ class ProgressService:
         ]
         
         # Workout data by week
-        workout_logs = ProgressCRUD.get_workout_history(db, user_id, days)
+        workout_logs = await ProgressCRUD.get_workout_history(
+            db, user_id, days, columns=("date", "completed")
+        )
         workout_data = self._aggregate_workouts_by_week(workout_logs)
         
         # Measurement data
-        measurement_logs = ProgressCRUD.get_measurement_history(db, user_id, days)
+        measurement_logs = await ProgressCRUD.get_measurement_history(
+            db, user_id, days, columns=("date", "waist_cm", "chest_cm", "biceps_cm")
+        )
         measurement_data = [
             {
                 "date": log.date.strftime("%Y-%m-%d"),
@@ -182,16 +259,18 @@ class ProgressService:
             measurement_data=measurement_data
         )
     
-    def get_progress_context_for_rag(self, db: Session, user_id: str) -> Dict:
-        """Get progress data formatted for RAG context."""
-        summary = self.get_progress_summary(db, user_id, days=30)
-        
-        weight_logs = ProgressCRUD.get_weight_history(db, user_id, 30)
-        weight_history = [log.weight_kg for log in weight_logs]
-        
-        calorie_logs = ProgressCRUD.get_calorie_history(db, user_id, 14)
-        avg_adherence = sum(log.total_calories for log in calorie_logs) / len(calorie_logs) if calorie_logs else 0
+    def build_progress_context(self, user: User, days: int = 30) -> Dict:
+        """Format a user's preloaded progress window (see UserCRUD.get_with_progress_window)."""
+        weight_logs = sorted(user.weight_logs, key=lambda log: log.date, reverse=True)
+        workout_logs = sorted(user.workout_logs, key=lambda log: log.date, reverse=True)
+        calorie_logs = sorted(user.calorie_logs, key=lambda log: log.date, reverse=True)
         
+        summary = self._build_summary(user.id, days, weight_logs, workout_logs, calorie_logs)
+        return self._summary_to_context(summary, [log.weight_kg for log in weight_logs])
+    
+    def _summary_to_context(self, summary: ProgressSummary,
+                            weight_history: List[float]) -> Dict:
+        """Shape a progress summary into the RAG context dictionary."""
         return {
             "weight_history": weight_history,
             "weight_trend": summary.weight_trend,
@@ -248,19 +327,21 @@ class ProgressService:
         if not workout_logs:
             return []
         
-        weeks = {}
+        # Count per ISO week number in one pass; labels are formatted once per week
+        planned, completed = Counter(), Counter()
         for log in workout_logs:
             week_num = log.date.isocalendar()[1]
-            week_key = f"Week {week_num}"
-            
-            if week_key not in weeks:
-                weeks[week_key] = {"completed": 0, "planned": 0}
-            
-            weeks[week_key]["planned"] += 1
+            planned[week_num] += 1
             if log.completed:
-                weeks[week_key]["completed"] += 1
+                completed[week_num] += 1
         
         return [
-            {"week": week, "completed": data["completed"], "planned": data["planned"]}
-            for week, data in weeks.items()
-        ]
\ No newline at end of file
+            {"week": f"Week {week_num}", "completed": completed[week_num], "planned": count}
+            for week_num, count in planned.items()
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_progress_service() -> ProgressService:
+    """Get cached progress service instance."""
+    return ProgressService()
\ No newline at end of file
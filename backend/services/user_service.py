@@ -2,13 +2,20 @@
 """User management service."""
 
 from typing import Optional, Dict
-from sqlalchemy.orm import Session
+from functools import lru_cache
+from cachetools import TTLCache
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.database.crud import UserCRUD
 from backend.database.models import User
 from backend.models.user import UserProfileCreate, UserProfileUpdate, UserProfileResponse
 from backend.services.calorie_service import CalorieCalculator
 
+# RAG profiles, keyed by user ID and stored with the user's updated_at; entries
+# are only served while that version is current, so updates made in other
+# worker processes are picked up on the next read
+_profile_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+
 
 class UserService:
     """Service for user-related operations."""
@@ -16,47 +23,49 @@ class UserService:
     def __init__(self):
         self.calorie_calculator = CalorieCalculator()
     
-    def create_user(self, db: Session, user_data: UserProfileCreate) -> UserProfileResponse:
+    async def create_user(self, db: AsyncSession, user_data: UserProfileCreate) -> UserProfileResponse:
         """Create a new user with calculated stats."""
         # Check if user exists
-        existing = UserCRUD.get_by_email(db, user_data.email)
+        existing = await UserCRUD.get_by_email(db, user_data.email)
         if existing:
             raise ValueError("User with this email already exists")
         
         # Create user
-        user = UserCRUD.create(db, user_data)
+        user = await UserCRUD.create(db, user_data)
         
         return self._user_to_response(user)
     
-    def get_user(self, db: Session, user_id: str) -> Optional[UserProfileResponse]:
+    async def get_user(self, db: AsyncSession, user_id: str) -> Optional[UserProfileResponse]:
         """Get user by ID."""
-        user = UserCRUD.get_by_id(db, user_id)
+        user = await UserCRUD.get_by_id(db, user_id)
         if user:
             return self._user_to_response(user)
         return None
     
-    def get_user_by_email(self, db: Session, email: str) -> Optional[UserProfileResponse]:
+    async def get_user_by_email(self, db: AsyncSession, email: str) -> Optional[UserProfileResponse]:
         """Get user by email."""
-        user = UserCRUD.get_by_email(db, email)
+        user = await UserCRUD.get_by_email(db, email)
         if user:
             return self._user_to_response(user)
         return None
     
-    def update_user(self, db: Session, user_id: str, 
-                    user_data: UserProfileUpdate) -> Optional[UserProfileResponse]:
+    async def update_user(self, db: AsyncSession, user_id: str, 
+                          user_data: UserProfileUpdate) -> Optional[UserProfileResponse]:
         """Update user profile."""
-        user = UserCRUD.update(db, user_id, user_data)
+        user = await UserCRUD.update(db, user_id, user_data)
+        self._invalidate_cache(user_id)
         if user:
             return self._user_to_response(user)
         return None
     
-    def delete_user(self, db: Session, user_id: str) -> bool:
+    async def delete_user(self, db: AsyncSession, user_id: str) -> bool:
         """Delete user."""
-        return UserCRUD.delete(db, user_id)
+        self._invalidate_cache(user_id)
+        return await UserCRUD.delete(db, user_id)
     
-    def get_user_stats(self, db: Session, user_id: str) -> Optional[Dict]:
+    async def get_user_stats(self, db: AsyncSession, user_id: str) -> Optional[Dict]:
         """Get calculated stats for a user."""
-        user = UserCRUD.get_by_id(db, user_id)
+        user = await UserCRUD.get_by_id(db, user_id)
         if not user:
             return None
         
@@ -71,6 +80,50 @@ class UserService:
         
         return self.calorie_calculator.calculate_all(profile)
     
+    async def get_user_profile(self, db: AsyncSession, user_id: str) -> Optional[Dict]:
+        """Get the profile dictionary used as RAG context."""
+        cached = _profile_cache.get(user_id)
+        if cached is not None:
+            version = await UserCRUD.get_updated_at(db, user_id)
+            if version is None:
+                return None
+            if cached[0] == version:
+                return dict(cached[1])
+        
+        user = await UserCRUD.get_by_id(db, user_id)
+        if not user:
+            return None
+        
+        return dict(self._cache_profile(user))
+    
+    def profile_from_user(self, user: User) -> Dict:
+        """Build (and cache) the RAG profile dictionary from a loaded user."""
+        return dict(self._cache_profile(user))
+    
+    def _cache_profile(self, user: User) -> Dict:
+        """Build the RAG profile dictionary and store it in the cache."""
+        profile = {
+            "name": user.name,
+            "age": user.age,
+            "gender": user.gender,
+            "height_cm": user.height_cm,
+            "weight_kg": user.weight_kg,
+            "fitness_goal": user.fitness_goal,
+            "activity_level": user.activity_level,
+            "dietary_preference": user.dietary_preference,
+            "experience_level": user.experience_level,
+            "workout_location": user.workout_location,
+            "workout_days_per_week": user.workout_days_per_week,
+            "medical_conditions": user.medical_conditions,
+            "allergies": user.allergies
+        }
+        _profile_cache[user.id] = (user.updated_at, profile)
+        return profile
+    
+    def _invalidate_cache(self, user_id: str) -> None:
+        """Drop cached derived data for a user."""
+        _profile_cache.pop(user_id, None)
+    
     def _user_to_response(self, user: User) -> UserProfileResponse:
         """Convert User model to response with calculated stats."""
         profile = {
@@ -105,4 +158,10 @@ class UserService:
             bmi=stats["bmi"],
             bmr=stats["bmr"],
             tdee=stats["tdee"]
-        )
\ No newline at end of file
+        )
+
+
+@lru_cache(maxsize=1)
+def get_user_service() -> UserService:
+    """Get cached user service instance."""
+    return UserService()
\ No newline at end of file
@@ -1,15 +1,21 @@
 # backend/utils/helpers.py
 """Helper utility functions."""
 
-import uuid
+import base64
+import os
 import re
 from datetime import datetime, date
 from typing import Optional
 
 
+# Patterns compiled once at import rather than looked up in re's cache per call
+_SANITIZE_RE = re.compile(r'[<>"\';]')
+_EMAIL_RE = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+
+
 def generate_id() -> str:
-    """Generate a unique ID."""
-    return str(uuid.uuid4())
+    """Generate a unique 22-character URL-safe ID from 128 random bits."""
+    return base64.urlsafe_b64encode(os.urandom(16)).rstrip(b'=').decode('ascii')
 
 
 def format_date(dt: datetime, format_str: str = "%Y-%m-%d") -> str:
@@ -28,7 +34,7 @@ def parse_date(date_str: str, format_str: str = "%Y-%m-%d") -> Optional[datetime
 def sanitize_string(text: str) -> str:
     """Sanitize a string by removing special characters."""
     # Remove any potentially harmful characters
-    sanitized = re.sub(r'[<>"\';]', '', text)
+    sanitized = _SANITIZE_RE.sub('', text)
     # Trim whitespace
     sanitized = sanitized.strip()
     return sanitized
@@ -74,8 +80,7 @@ def calculate_water_intake(weight_kg: float) -> float:
 
 def validate_email(email: str) -> bool:
     """Validate email format."""
-    pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email))
 
 
 def truncate_text(text: str, max_length: int = 100) -> str:
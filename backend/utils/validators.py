@@ -6,6 +6,10 @@ from pydantic import validator
 import re
 
 
+_EMAIL_RE = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+_SANITIZE_STRICT_RE = re.compile(r'[<>"\';{}]')
+
+
 class InputValidator:
     """Collection of input validation methods."""
     
@@ -27,8 +31,7 @@ class InputValidator:
     @staticmethod
     def validate_email(email: str) -> bool:
         """Validate email format."""
-        pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-        return bool(re.match(pattern, email))
+        return bool(_EMAIL_RE.match(email))
     
     @staticmethod
     def validate_workout_days(days: int) -> bool:
@@ -41,7 +44,7 @@ class InputValidator:
         if not text:
             return ""
         # Remove potentially harmful characters
-        sanitized = re.sub(r'[<>"\';{}]', '', text)
+        sanitized = _SANITIZE_STRICT_RE.sub('', text)
         return sanitized.strip()
     
     @staticmethod
@@ -70,11 +70,13 @@ class APIClient:
         }
         return self._request("POST", "/plans/generate", data=data)
     
-    def generate_workout_plan(self, user_id: str) -> Dict:
-        return self._request("POST", f"/plans/{user_id}/workout")
+    def generate_workout_plan(self, user_id: str, regenerate: bool = False) -> Dict:
+        query = "?regenerate=true" if regenerate else ""
+        return self._request("POST", f"/plans/{user_id}/workout{query}")
     
-    def generate_diet_plan(self, user_id: str) -> Dict:
-        return self._request("POST", f"/plans/{user_id}/diet")
+    def generate_diet_plan(self, user_id: str, regenerate: bool = False) -> Dict:
+        query = "?regenerate=true" if regenerate else ""
+        return self._request("POST", f"/plans/{user_id}/diet{query}")
     
     def get_active_plans(self, user_id: str) -> Dict:
         return self._request("GET", f"/plans/{user_id}/active")
@@ -57,7 +57,7 @@ if regenerate or "workout_plan" not in st.session_state:
             if custom:
                 result = api_client.generate_plan(user_id, "workout", custom)
             else:
-                result = api_client.generate_workout_plan(user_id)
+                result = api_client.generate_workout_plan(user_id, regenerate=regenerate)
             
             if "error" not in result:
                 st.session_state["workout_plan"] = result
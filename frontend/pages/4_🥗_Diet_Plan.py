@@ -61,7 +61,7 @@ if regenerate or "diet_plan" not in st.session_state:
             if custom:
                 result = api_client.generate_plan(user_id, "diet", custom)
             else:
-                result = api_client.generate_diet_plan(user_id)
+                result = api_client.generate_diet_plan(user_id, regenerate=regenerate)
             
             if "error" not in result:
                 st.session_state["diet_plan"] = result
@@ -1,6 +1,7 @@
 # scripts/ingest_data.py
 """Script to ingest all fitness and diet data into Pinecone."""
 
+import argparse
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,6 +12,13 @@ from backend.rag.vectorstore import get_pinecone_manager
 
 def main():
     """Main ingestion script."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--clear", action="store_true",
+        help="Delete existing workout/diet vectors first (needed once after chunk ID changes)"
+    )
+    args = parser.parse_args()
+    
     print("🚀 Starting data ingestion...")
     
     # Initialize Pinecone
@@ -22,6 +30,11 @@ def main():
     # Get ingester
     ingester = get_ingester()
     
+    if args.clear:
+        print("🧹 Clearing existing namespaces...")
+        for namespace in ("workouts", "diets"):
+            ingester.clear_namespace(namespace)
+    
     # Ingest all data
     print("📥 Ingesting data from data/raw...")
     stats = ingester.ingest_all("data/raw")